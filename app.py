@@ -1,7 +1,16 @@
-from flask import Flask, render_template, request, jsonify
-from ianis import main
+import json
+import logging
+import os
+import time
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from ianis import main, main_iter, map_questions, warmup, stats
+from mapping import format_mapping, parse_questions, question_format
+from modules.metrics import metrics, request_trace
 
 
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 
 # Liste de réponses prédéfinies pour la démonstration
@@ -18,10 +27,21 @@ def index():
 
 @app.route('/requestMapping', methods=['POST'])
 def poser_question():
-    """Route qui reçoit la question et renvoie des réponses"""
+    """
+    Route qui reçoit la question et renvoie des réponses (et les durées par étape si 'timings' est demandé).
+    Avec stream=ndjson ou stream=sse, chaque document est envoyé dès qu'il est prêt.
+    """
     question = request.form.get('question', '')
+    timings = bool(request.values.get('timings'))
+
+    stream = request.values.get('stream')
+    if stream in STREAM_FORMATS:
+        events = stream_with_context(question_events(question, timings))
+        return Response((format_event(event, stream) for event in events), mimetype=STREAM_FORMATS[stream],
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
     
-    responses = main(input_text=question)
+    with request_trace() as trace:
+        responses = main(input_text=question)
     r = []
     for k in responses.keys():
         r.append({
@@ -29,10 +49,126 @@ def poser_question():
             "reps": responses[k]
         })
 
-    return jsonify({
+    result = {
         'question': question,
         'reponses': r
-    })
+    }
+    pruned = pruned_statements(trace)
+    if pruned is not None:
+        result['pruned'] = pruned
+    if timings:
+        result['timings'] = trace
+    return jsonify(result)
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+def question_events(question, timings=False):
+    """
+    Événements d'une question : un par document, puis un résumé final. Si la recherche
+    échoue en cours de route, un événement "error" remplace le résumé : le client
+    distingue ainsi un échec d'une réponse terminée
+    """
+    start = time.perf_counter()
+    docs = []
+    with request_trace() as trace:
+        try:
+            for doc, matches in main_iter(input_text=question):
+                docs.append(str(doc))
+                yield {
+                    "type": "document",
+                    "doc": str(doc),
+                    "reps": [match["text"] for match in matches],
+                    "scores": [match["score"] for match in matches],
+                    "elapsed_ms": (time.perf_counter() - start) * 1000,
+                }
+        except Exception as e:
+            # Les en-têtes sont déjà envoyés : l'erreur ne peut plus passer par le code HTTP
+            logger.exception("Error while streaming the answer to %r", question)
+            yield {
+                "type": "error",
+                "error": str(e) or type(e).__name__,
+                "docs": docs,
+                "elapsed_ms": (time.perf_counter() - start) * 1000,
+            }
+            return
+
+    summary = {
+        "type": "summary",
+        "question": question,
+        "docs": docs,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
+    pruned = pruned_statements(trace)
+    if pruned is not None:
+        summary["pruned"] = pruned
+    if timings:
+        summary["timings"] = trace
+    yield summary
+
+def pruned_statements(trace):
+    """Nombre d'énoncés écartés par la recherche hiérarchique (None si elle n'a pas eu lieu)"""
+    counts = [entry["pruned"] for entry in trace if "pruned" in entry]
+    return sum(counts) if counts else None
+
+def format_event(event, stream):
+    """Sérialise un événement en une ligne NDJSON ou un message server-sent events"""
+    data = json.dumps(event, ensure_ascii=False)
+    if stream == "sse":
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+@app.route('/batchMapping', methods=['POST'])
+def mapping_questions():
+    """
+    Route qui met en correspondance une liste de questions avec le corpus.
+    Questions en JSON ({"questions": [...]}), en fichier ('file' : csv, json ou txt)
+    ou en texte ('questions' : une par ligne) ; réponse en JSON ou en CSV (format=csv).
+    """
+    try:
+        if request.is_json:
+            ids, questions = parse_questions(request.get_data(as_text=True), "json")
+        elif 'file' in request.files:
+            upload = request.files['file']
+            try:
+                content = upload.read().decode('utf-8-sig')
+            except UnicodeDecodeError as e:
+                raise ValueError(f"File is not valid UTF-8: {e}") from e
+            ids, questions = parse_questions(content, question_format(upload.filename or ""))
+        else:
+            ids, questions = parse_questions(request.form.get('questions', ''), "txt")
+    except ValueError as e:
+        # Liste de questions invalide : erreur du client, pas du serveur
+        return jsonify({'error': str(e)}), 400
+
+    top_k = request.values.get('top_k', 2, type=int)
+    top_docs = request.values.get('top_docs', 2, type=int)
+    min_score = request.values.get('min_score', None, type=float)
+    mapping = map_questions(questions, ids, top_k, top_docs, min_score)
+
+    if request.values.get('format') == 'csv':
+        return Response(format_mapping(mapping, "csv"), mimetype="text/csv",
+                        headers={"Content-Disposition": "attachment; filename=mapping.csv"})
+    return jsonify({'questions': len(questions), 'mapping': mapping})
+
+@app.route('/stats')
+def statistiques():
+    """Route qui expose les compteurs des caches et du regroupement des requêtes"""
+    return jsonify(stats())
+
+@app.route('/metrics')
+def metriques():
+    """Route qui expose les durées par étape et les jauges au format Prometheus"""
+    return Response(metrics.prometheus_text(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == '__main__':
+    # Chargement du modèle au démarrage plutôt qu'à la première question
+    # (IANIS_WARMUP=0 : démarrage immédiat, le modèle est chargé à la première question).
+    # Avec debug=True, le rechargeur relance le script dans un processus enfant
+    # (WERKZEUG_RUN_MAIN) : seul celui-ci sert les requêtes, et donc charge le modèle.
+    # Sous gunicorn, le chargement est fait par les hooks de gunicorn.conf.py.
+    if os.environ.get("IANIS_WARMUP", "1") != "0" and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        warmup()
     app.run(debug=True)
\ No newline at end of file
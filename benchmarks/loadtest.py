@@ -0,0 +1,306 @@
+"""
+Test de charge HTTP de /requestMapping : concurrence et débit configurables, questions
+de contrôle réalistes, débit obtenu, latences p50/p95/p99 et taux d'erreur.
+
+Exemples :
+    python -m benchmarks.loadtest --serve --prefix E --concurrency 8 --requests 500
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 --rate 20 --duration 60 --out load.json
+    IANIS_FAKE_ENCODER=1 gunicorn -c gunicorn.conf.py   (puis python -m benchmarks.loadtest)
+
+Avec --serve, l'application est lancée dans le processus avec l'encodeur factice
+(IANIS_FAKE_ENCODER=1, sauf --real-encoder) : le service, l'analyse et le scoring
+sont mesurés sans les poids du modèle.
+"""
+import argparse
+import json
+import os
+import platform
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+QUESTIONS = [
+    "Des outils de sauvegarde doivent être mis en place pour restituer les données",
+    "L'accès à distance au réseau interne doit se faire via une méthode sécurisée",
+    "Le développement de logiciels doit prendre en compte la minimisation des vulnérabilités",
+    "Les incidents de sécurité doivent être signalés au responsable de la sécurité",
+    "Les mots de passe doivent respecter une politique de complexité",
+    "Les droits d'accès des utilisateurs sont revus au moins une fois par an",
+    "Les comptes des collaborateurs qui quittent l'organisation sont désactivés sans délai",
+    "L'authentification multifacteur est exigée pour les accès d'administration",
+    "Les postes de travail nomades disposent d'un chiffrement complet du disque",
+    "Les télétravailleurs utilisent un VPN pour se connecter au système d'information",
+    "Les correctifs de sécurité sont appliqués dans un délai défini selon leur criticité",
+    "Un plan de reprise d'activité est formalisé et testé régulièrement",
+    "Les sauvegardes sont stockées hors site et leur restauration est vérifiée",
+    "Une cellule de crise est mobilisable en cas d'incident majeur",
+    "Les journaux d'événements sont centralisés et conservés pendant une durée définie",
+    "Les revues de code intègrent des contrôles de sécurité avant la mise en production",
+    "Les dépendances logicielles sont analysées pour détecter les vulnérabilités connues",
+    "Les environnements de développement, de test et de production sont séparés",
+    "Les collaborateurs suivent une sensibilisation annuelle à la sécurité de l'information",
+    "La politique de sécurité est approuvée par la direction et révisée chaque année",
+    "Les données sensibles sont classifiées et protégées selon leur niveau de confidentialité",
+    "Les prestataires s'engagent contractuellement à respecter les exigences de sécurité",
+    "Les obligations légales et réglementaires applicables sont identifiées",
+    "Les équipements personnels ne doivent pas être utilisés pour traiter des données de l'organisation",
+]
+
+
+class Schedule:
+    """
+    Distribue les requêtes aux threads : au plus max_requests, pendant au plus duration
+    secondes et, avec un débit cible, la requête i n'est pas envoyée avant start + i / rate.
+    """
+
+    def __init__(self, max_requests=None, duration=None, rate=None):
+        self.max_requests = max_requests
+        self.duration = duration
+        self.rate = rate
+        self.start = time.perf_counter()
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        """
+        Returns:
+            i, at: Numéro de la requête et instant prévu de son envoi, ou None si le test est terminé
+        """
+        with self._lock:
+            i = self.count
+            if self.max_requests is not None and i >= self.max_requests:
+                return None
+            at = self.start + i / self.rate if self.rate else time.perf_counter()
+            if self.duration is not None and at - self.start >= self.duration:
+                return None
+            self.count += 1
+            return i, at
+
+
+def post_question(url, question, params, timeout):
+    """
+    Envoie une question à /requestMapping et lit toute la réponse (flux compris).
+
+    Returns:
+        status, error: Code HTTP (None si la connexion a échoué) et description de l'erreur éventuelle
+    """
+    data = urllib.parse.urlencode(dict(params, question=question)).encode("utf-8")
+    try:
+        with urllib.request.urlopen(url + "/requestMapping", data=data, timeout=timeout) as response:
+            body = response.read()
+            if "stream" not in params:
+                json.loads(body)
+            return response.status, None
+    except urllib.error.HTTPError as e:
+        return e.code, f"HTTP {e.code}"
+    except Exception as e:
+        return None, type(e).__name__
+
+
+def run_load(url, questions, concurrency=4, max_requests=None, duration=None, rate=None,
+             params=None, distinct=False, timeout=60.0):
+    """
+    Envoie des questions à /requestMapping avec concurrency threads.
+
+    Args:
+        url: Adresse du service (sans /requestMapping)
+        questions: Questions envoyées à tour de rôle
+        concurrency: Nombre de requêtes simultanées au plus
+        max_requests: Nombre de requêtes (facultatif)
+        duration: Durée du test en secondes (facultatif)
+        rate: Débit cible en requêtes par seconde (None : aussi vite que possible)
+        params: Paramètres ajoutés à chaque requête (ex. {"stream": "ndjson"})
+        distinct: Rendre chaque question unique, pour ne pas mesurer le cache des résultats
+        timeout: Délai maximal d'une requête, en secondes
+
+    Returns:
+        samples, elapsed: Liste de (latence en s, code HTTP, erreur) et durée totale
+
+    Avec un débit cible, la latence est comptée depuis l'instant prévu de l'envoi et
+    non depuis l'envoi effectif : une requête retardée parce que tous les threads
+    étaient occupés compte son attente (pas d'omission coordonnée).
+    """
+    params = params or {}
+    schedule = Schedule(max_requests, duration, rate)
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            item = schedule.next()
+            if item is None:
+                return
+            i, at = item
+            delay = at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            question = questions[i % len(questions)]
+            if distinct:
+                question = f"{question} ({i})"
+            start = at if rate else time.perf_counter()
+            status, error = post_question(url, question, params, timeout)
+            latency = time.perf_counter() - start
+            with lock:
+                samples.append((latency, status, error))
+
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="load") as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return samples, time.perf_counter() - schedule.start
+
+
+def summarize(samples, elapsed):
+    """
+    Résume un test de charge.
+
+    Returns:
+        result: Nombre de requêtes, taux d'erreur, débit (requêtes réussies par seconde)
+            et latences p50/p95/p99 (ms) des requêtes réussies
+    """
+    latencies = np.array([latency for latency, _, error in samples if error is None])
+    errors = Counter(error for _, _, error in samples if error is not None)
+    result = {
+        "requests": len(samples),
+        "errors": sum(errors.values()),
+        "error_rate": sum(errors.values()) / len(samples) if samples else 0.0,
+        "error_types": dict(errors),
+        "duration_s": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed > 0 else None,
+    }
+    if len(latencies):
+        result.update({
+            "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+            "p95_ms": float(np.percentile(latencies, 95)) * 1000,
+            "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+            "mean_ms": float(latencies.mean()) * 1000,
+            "max_ms": float(latencies.max()) * 1000,
+        })
+    return result
+
+
+def server_stats(url, timeout=10.0):
+    """Compteurs du service (/stats : planificateur d'encodage, caches), ou None s'ils sont indisponibles."""
+    try:
+        with urllib.request.urlopen(url + "/stats", timeout=timeout) as response:
+            return json.loads(response.read())
+    except Exception:
+        return None
+
+
+def serve_local(real_encoder=False, prefix=None):
+    """
+    Lance l'application dans un thread, sur un port libre.
+
+    Args:
+        real_encoder: Utiliser le vrai modèle plutôt que l'encodeur factice
+        prefix: Préfixe des énoncés du corpus (facultatif)
+
+    Returns:
+        url, server: Adresse du service et serveur à arrêter (server.shutdown())
+    """
+    # Lus à l'import de ianis, donc fixés avant celui de l'application
+    if not real_encoder:
+        os.environ.setdefault("IANIS_FAKE_ENCODER", "1")
+    if prefix:
+        os.environ["IANIS_STATEMENT_PREFIX"] = prefix
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="loadtest-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def read_question_file(path):
+    """Questions d'un fichier (.csv, .json ou une par ligne, voir mapping.parse_questions)."""
+    from mapping import parse_questions, question_format
+
+    with open(path, encoding="utf-8-sig") as f:
+        return parse_questions(f.read(), question_format(path))[1]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge de /requestMapping")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="Adresse du service")
+    parser.add_argument("--serve", action="store_true", help="Lancer l'application dans le processus")
+    parser.add_argument("--real-encoder", action="store_true", help="Avec --serve, utiliser le vrai modèle")
+    parser.add_argument("--prefix", help="Avec --serve, préfixe des énoncés du corpus (ex. E pour les PDF de tests/)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requêtes simultanées")
+    parser.add_argument("--requests", type=int, help="Nombre de requêtes (200 par défaut sans --duration)")
+    parser.add_argument("--duration", type=float, help="Durée du test en secondes")
+    parser.add_argument("--rate", type=float, help="Débit cible en requêtes/s (sinon aussi vite que possible) ; "
+                        "les latences comptent alors depuis l'instant prévu de chaque envoi")
+    parser.add_argument("--warmup", type=int, default=5, help="Requêtes préalables non mesurées")
+    parser.add_argument("--questions", help="Fichier de questions (.csv, .json ou une par ligne)")
+    parser.add_argument("--distinct", action="store_true", help="Questions toutes différentes (cache des résultats évité)")
+    parser.add_argument("--stream", choices=["ndjson", "sse"], help="Réponses en flux")
+    parser.add_argument("--timings", action="store_true", help="Demander les durées par étape")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--label", help="Nom de la configuration testée, repris dans le rapport")
+    parser.add_argument("--out", help="Fichier JSON de sortie (sinon sortie standard)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.requests is None and args.duration is None:
+        args.requests = 200
+
+    questions = read_question_file(args.questions) if args.questions else QUESTIONS
+    params = {}
+    if args.stream:
+        params["stream"] = args.stream
+    if args.timings:
+        params["timings"] = 1
+
+    server = None
+    url = args.url.rstrip("/")
+    if args.serve:
+        url, server = serve_local(args.real_encoder, args.prefix)
+
+    try:
+        if args.warmup:
+            run_load(url, questions, 1, args.warmup, params=params, timeout=args.timeout)
+        samples, elapsed = run_load(url, questions, args.concurrency, args.requests, args.duration,
+                                    args.rate, params, args.distinct, args.timeout)
+        stats = server_stats(url)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = {
+        "label": args.label,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "url": url if not args.serve else "local",
+            "fake_encoder": os.environ.get("IANIS_FAKE_ENCODER", "0") != "0" if args.serve else None,
+        },
+        "load": {
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "distinct": args.distinct,
+            "params": params,
+            "questions": len(questions),
+        },
+        "result": summarize(samples, elapsed),
+        "server": stats,
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Suite de benchmarks reproductible : extraction PDF, encodage, recherche et ianis.main.
+
+Exemples :
+    python -m benchmarks.run --out bench.json
+    python -m benchmarks.run --stages search --scales 100 10000 1000000
+    python -m benchmarks.run --model /chemin/vers/modele --stages encoding end_to_end
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import numpy as np
+
+from modules.pdf import PDFStructureAnalyzer, CorpusIndex
+from modules.analyzer import Scorer, StatementIndex, get_model
+from modules.analyzer.embedding import DEFAULT_MODEL, get_embedding, get_embeddings, find_most_similar
+from .synthetic import make_statements, make_structure, make_policy_pdf
+
+STAGES = ["extraction", "encoding", "search", "end_to_end"]
+SCALES = [100, 10000, 1000000]
+# Au-delà, les PDF synthétiques et l'encodage réel deviennent trop longs pour un benchmark
+MAX_PDF_STATEMENTS = 10000
+MAX_ENCODE_STATEMENTS = 10000
+
+QUESTIONS = [
+    "Des outils de sauvegarde doivent être mis en place pour restituer les données",
+    "L'accès à distance au réseau interne doit se faire via une méthode sécurisée",
+    "Le développement de logiciels doit prendre en compte la minimisation des vulnérabilités",
+    "Les incidents de sécurité doivent être signalés au responsable de la sécurité",
+    "Les mots de passe doivent respecter une politique de complexité",
+]
+
+
+def reset_peak_rss():
+    """Remet à zéro le pic de mémoire résidente du processus (Linux uniquement)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus, en Mo."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(fn, items=1, repeat=5, warmup=1):
+    """
+    Exécute fn plusieurs fois et résume les temps mesurés.
+
+    Args:
+        fn: Fonction sans argument à mesurer
+        items: Nombre d'éléments traités par appel (pour le débit)
+        repeat: Nombre d'exécutions mesurées
+        warmup: Nombre d'exécutions préalables non mesurées
+
+    Returns:
+        result: Latences p50/p95 (ms), débit (éléments/s) et pic de mémoire (Mo)
+    """
+    for _ in range(warmup):
+        fn()
+
+    reset_peak_rss()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    times = np.array(times)
+    median = float(np.percentile(times, 50))
+    return {
+        "items": items,
+        "runs": repeat,
+        "p50_ms": median * 1000,
+        "p95_ms": float(np.percentile(times, 95)) * 1000,
+        "mean_ms": float(times.mean()) * 1000,
+        "throughput": items / median if median > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def quiet(fn):
+    """Enveloppe fn pour masquer ses sorties standard."""
+    def wrapper():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return wrapper
+
+
+def random_embeddings(n, dim, seed=0):
+    """Matrice (n, dim) de vecteurs normalisés aléatoires, pour mesurer la recherche sans modèle."""
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((n, dim), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix
+
+
+def bench_extraction(args, workdir):
+    """Temps de chaque étape de PDFStructureAnalyzer, sur les PDF de tests/ et des PDF synthétiques."""
+    results = []
+    paths = [(os.path.join("tests", f), "tests") for f in sorted(os.listdir("tests")) if f.endswith(".pdf")]
+    for scale in args.scales:
+        if scale > MAX_PDF_STATEMENTS:
+            continue
+        path = os.path.join(workdir, f"synthetic-{scale}.pdf")
+        make_policy_pdf(path, scale, args.seed)
+        paths.append((path, scale))
+
+    for path, scale in paths:
+        analyzer = PDFStructureAnalyzer(path, args.prefix)
+        stages = {
+            "extract_with_pymupdf": analyzer.extract_with_pymupdf,
+            "identify_titles_by_font": analyzer.identify_titles_by_font,
+            "parse_structure": lambda: (analyzer.structure.clear(), analyzer.parse_structure()),
+        }
+        for name, fn in stages.items():
+            # Le texte doit être extrait avant de mesurer les étapes suivantes
+            analyzer.extract_with_pymupdf()
+            result = measure(fn, repeat=args.repeat)
+            statements = sum(len(s) for s in analyzer.parse_structure().values())
+            analyzer.structure.clear()
+            result.update(stage="extraction", step=name, document=os.path.basename(path),
+                          scale=scale, statements=statements)
+            results.append(result)
+    return results
+
+
+def bench_encoding(args, tokenizer, model):
+    """Encodage unitaire (get_embedding) et par lots (get_embeddings)."""
+    results = []
+    single = make_statements(32, args.seed)
+    texts = iter(single * args.repeat * 2)
+    result = measure(lambda: get_embedding(next(texts), tokenizer, model), repeat=len(single))
+    result.update(stage="encoding", step="get_embedding", scale=1)
+    results.append(result)
+
+    for scale in args.scales:
+        n = min(scale, MAX_ENCODE_STATEMENTS)
+        statements = make_statements(n, args.seed)
+        result = measure(lambda: get_embeddings(statements, tokenizer, model), items=n,
+                         repeat=max(1, args.repeat // 2), warmup=0)
+        result.update(stage="encoding", step="get_embeddings", scale=n)
+        results.append(result)
+    return results
+
+
+def bench_search(args, tokenizer, model):
+    """Scoring sur des embeddings aléatoires, et find_most_similar avec le modèle si disponible."""
+    results = []
+    dim = model.config.hidden_size if model is not None else args.dim
+    for scale in args.scales:
+        matrix = random_embeddings(scale, dim, args.seed)
+        queries = random_embeddings(len(QUESTIONS), dim, args.seed + 1)
+        scorer = Scorer(matrix)
+        it = iter(list(queries) * (args.repeat + 1))
+        result = measure(lambda: scorer.top_k(next(it), 2), repeat=args.repeat)
+        result.update(stage="search", step="scorer_top_k", scale=scale)
+        results.append(result)
+
+        # Index global par document, avec des embeddings précalculés
+        n_docs = max(1, scale // 1000)
+        documents = {f"doc{d}": make_structure(scale // n_docs, args.seed + d) for d in range(n_docs)}
+        index = StatementIndex(lambda texts: random_embeddings(len(texts), dim, args.seed))
+        index.build(documents)
+        it = iter(list(queries) * (args.repeat + 1))
+        result = measure(lambda: index.search(next(it), 2, 2), repeat=args.repeat)
+        result.update(stage="search", step="statement_index", scale=len(index))
+        results.append(result)
+
+    if model is not None:
+        for scale in args.scales:
+            n = min(scale, MAX_ENCODE_STATEMENTS)
+            statements = make_statements(n, args.seed)
+            questions = iter(QUESTIONS * args.repeat * 2)
+            result = measure(lambda: find_most_similar(next(questions), statements, tokenizer, model),
+                             items=n, repeat=max(1, args.repeat // 2), warmup=0)
+            result.update(stage="search", step="find_most_similar", scale=n)
+            results.append(result)
+    return results
+
+
+def bench_end_to_end(args, model_name, workdir):
+    """ianis.main sur les PDF de tests/, puis sur un corpus synthétique."""
+    import ianis
+
+    results = []
+    corpora = [("tests", "tests")]
+    for scale in args.scales:
+        if scale > MAX_PDF_STATEMENTS:
+            continue
+        directory = os.path.join(workdir, f"corpus-{scale}")
+        make_policy_pdf(os.path.join(directory, "politique synthetique.pdf"), scale, args.seed)
+        corpora.append((directory, scale))
+
+    ianis.MODELS[ianis.MODE] = model_name
+    for directory, scale in corpora:
+        ianis.CORPUS = CorpusIndex(directory, os.path.join(workdir, f"index-{scale}.json"), args.prefix)
+        ianis._indexes.clear()
+        quiet(lambda: ianis.main(QUESTIONS[0]))()
+        index = ianis.statement_index()
+
+        # Questions toujours différentes : caches vidés avant chaque appel
+        questions = iter(QUESTIONS * (args.repeat + 1))
+        def cold():
+            index.cache.embeddings.clear()
+            index.cache.results.clear()
+            ianis.main(next(questions))
+        result = measure(quiet(cold), repeat=args.repeat)
+        result.update(stage="end_to_end", step="main", scale=scale, statements=len(index))
+        results.append(result)
+
+        result = measure(quiet(lambda: ianis.main(QUESTIONS[0])), repeat=args.repeat)
+        result.update(stage="end_to_end", step="main_cached", scale=scale, statements=len(index))
+        results.append(result)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks IANIS")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--scales", nargs="+", type=int, default=SCALES)
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Nom ou chemin du modèle d'embeddings")
+    parser.add_argument("--prefix", default="E", help="Préfixe des énoncés des PDF de test")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=768, help="Dimension des vecteurs si le modèle est absent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Fichier JSON de sortie (sinon sortie standard)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "model": args.model,
+        },
+        "results": [],
+        "skipped": {},
+    }
+
+    tokenizer = model = None
+    if {"encoding", "search", "end_to_end"} & set(args.stages):
+        try:
+            tokenizer, model = get_model(args.model)
+        except Exception as e:
+            report["skipped"]["model"] = str(e)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for stage in args.stages:
+            if stage == "extraction":
+                report["results"] += bench_extraction(args, workdir)
+            elif stage == "encoding" and model is not None:
+                report["results"] += bench_encoding(args, tokenizer, model)
+            elif stage == "search":
+                report["results"] += bench_search(args, tokenizer, model)
+            elif stage == "end_to_end" and model is not None:
+                report["results"] += bench_end_to_end(args, args.model, workdir)
+            elif model is None:
+                report["skipped"][stage] = "model unavailable"
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import random
+import fitz  # PyMuPDF
+
+SUBJECTS = [
+    "Les sauvegardes des données critiques", "L'accès au réseau interne", "Les comptes à privilèges",
+    "Les postes de travail", "Les mots de passe", "Les journaux d'événements", "Les prestataires",
+    "Les applications exposées sur Internet", "Les correctifs de sécurité", "Les incidents de sécurité",
+    "Les supports amovibles", "Les connexions distantes", "Les environnements de développement",
+    "Les plans de continuité d'activité", "Les données personnelles",
+]
+VERBS = [
+    "doivent être", "sont", "doivent faire l'objet d'un contrôle pour être", "sont régulièrement",
+    "doivent systématiquement être",
+]
+COMPLEMENTS = [
+    "chiffrés en transit et au repos", "testés au moins une fois par an", "revus chaque trimestre",
+    "signalés immédiatement au RSSI", "protégés par une authentification multi-facteurs",
+    "conservés pendant au moins un an", "appliqués dans un délai de 30 jours",
+    "documentés dans le registre des traitements", "isolés du réseau de production",
+    "validés par le responsable de la sécurité", "restaurés lors d'exercices périodiques",
+]
+SECTIONS = [
+    "Gouvernance", "Gestion des accès", "Protection des données", "Sauvegarde", "Continuité d'activité",
+    "Gestion des vulnérabilités", "Développement sécurisé", "Télétravail", "Gestion des incidents",
+]
+
+
+def make_statement(rng):
+    """Génère un énoncé d'exigence de sécurité plausible."""
+    return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(COMPLEMENTS)}."
+
+
+def make_statements(n, seed=0):
+    """
+    Génère une liste d'énoncés au format utilisé par l'index ("E1 texte").
+
+    Args:
+        n: Nombre d'énoncés
+        seed: Graine du générateur (résultats reproductibles)
+    """
+    rng = random.Random(seed)
+    return [f"E{i + 1} {make_statement(rng)}" for i in range(n)]
+
+
+def make_structure(n, seed=0, statements_per_section=20, prefix="E"):
+    """
+    Génère directement une structure de document (section -> énoncés), comme celle
+    produite par PDFStructureAnalyzer, sans passer par un PDF.
+    """
+    rng = random.Random(seed)
+    structure = {}
+    for i in range(n):
+        title = f"{rng.choice(SECTIONS)} {i // statements_per_section + 1}"
+        structure.setdefault(title, []).append({
+            "id": f"{prefix}{i + 1}",
+            "text": make_statement(rng),
+            "line": i,
+        })
+    return structure
+
+
+def make_policy_pdf(path, n_statements, seed=0, statements_per_section=10, prefix="E"):
+    """
+    Écrit un PDF de politique de sécurité synthétique, avec des sections numérotées
+    ("1. Titre") et des énoncés ("E1 : texte") sur plusieurs lignes si besoin.
+
+    Args:
+        path: Chemin du PDF à écrire
+        n_statements: Nombre d'énoncés
+        seed: Graine du générateur
+        statements_per_section: Nombre d'énoncés par section
+        prefix: Préfixe des identifiants d'énoncés
+    """
+    rng = random.Random(seed)
+    lines = ["Politique de Sécurité des Systèmes d'Information"]
+    for i in range(n_statements):
+        if i % statements_per_section == 0:
+            lines.append(f"{i // statements_per_section + 1}. {rng.choice(SECTIONS)}")
+        lines.append(f"{prefix}{i + 1} : {make_statement(rng)}")
+        if rng.random() < 0.3:
+            lines.append(make_statement(rng).lower())
+
+    doc = fitz.open()
+    lines_per_page = 45
+    for start in range(0, len(lines), lines_per_page):
+        page = doc.new_page()
+        y = 50
+        for line in lines[start:start + lines_per_page]:
+            page.insert_text((50, y), line, fontsize=10)
+            y += 15
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    doc.save(path)
+    doc.close()
+
+
+def make_corpus(directory, n_documents, statements_per_document, seed=0, prefix="E"):
+    """Écrit un dossier de PDF synthétiques et renvoie leurs chemins."""
+    paths = []
+    for i in range(n_documents):
+        path = os.path.join(directory, f"politique synthetique {i + 1}.pdf")
+        if not os.path.exists(path):
+            make_policy_pdf(path, statements_per_document, seed + i, prefix=prefix)
+        paths.append(path)
+    return paths
@@ -0,0 +1,47 @@
+"""
+Configuration gunicorn pour servir IANIS avec plusieurs workers :
+    gunicorn -c gunicorn.conf.py
+
+Le modèle, le corpus et la matrice des énoncés sont chargés une seule fois par le
+processus maître, avant le fork (preload_app) : les workers en partagent les pages
+en copie sur écriture au lieu d'en charger chacun une copie. Avec ianis.COMPACT,
+la matrice est en plus ouverte en memmap et partagée par le cache de pages.
+Le maître surveille seul le corpus : à chaque changement, il ré-indexe puis relance
+les workers (rechargement progressif), qui héritent du nouvel index.
+
+Variables d'environnement : IANIS_BIND, IANIS_WORKERS, IANIS_THREADS (et celles lues par
+ianis.py : IANIS_STATEMENT_PREFIX, IANIS_FAKE_ENCODER, IANIS_FAKE_ENCODER_MS).
+"""
+import os
+
+CPUS = os.cpu_count() or 1
+
+bind = os.environ.get("IANIS_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("IANIS_WORKERS", CPUS))
+# Requêtes simultanées par worker, regroupées en lots par le MicroBatcher
+worker_class = "gthread"
+threads = int(os.environ.get("IANIS_THREADS", 4))
+preload_app = True
+wsgi_app = "app:app"
+timeout = 120
+
+# Threads de calcul par worker, pour que les workers ne se disputent pas les cœurs
+COMPUTE_THREADS = max(1, CPUS // workers)
+
+# Lu par OpenMP au chargement de torch, donc fixé avant l'import de l'application
+os.environ.setdefault("OMP_NUM_THREADS", str(COMPUTE_THREADS))
+
+
+def on_starting(server):
+    import ianis
+
+    ianis.prefork()
+    # Une seule surveillance du corpus, dans le maître : les workers sont relancés
+    # (et partagent à nouveau l'index du maître) quand il change
+    ianis.watch_workers()
+
+
+def post_fork(server, worker):
+    import ianis
+
+    ianis.postfork(num_threads=COMPUTE_THREADS, watch=False)
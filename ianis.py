@@ -1,47 +1,269 @@
 from modules.pdf import *
 from modules.analyzer import *
+from modules.metrics import metrics
+import gc
+import logging
 import os
+import signal
+import threading
 
 DIR = "tests"
+STATEMENT_PREFIX = os.environ.get("IANIS_STATEMENT_PREFIX", "VUL")
+MODE = 1
+MODELS = {1: DEFAULT_MODEL, 2: MODEL}
+ENCODERS = {1: load_encoder, 2: load_encoder2}
+BACKEND = "torch"
+NUM_THREADS = None
+COMPACT = None  # "float16" ou "int8" : matrice des énoncés compacte en memmap
+COMPACT_EXACT = False  # Copie float32 de la matrice compacte, pour reclasser les candidats
+PREFILTER = None  # Nombre de candidats présélectionnés par BM25 avant le scoring dense
+FUSION = None  # Poids du score BM25 dans le score final (recherche hybride)
+TOP_SECTIONS = None  # Recherche hiérarchique : sections retenues avant de scorer leurs énoncés
+DEDUP = None  # Seuil (ex. 0.8) au-delà duquel des énoncés quasi identiques partagent un vecteur (avec PREFILTER : COMPACT requis)
+SHARDS = False  # Index partitionné par document, scoré en parallèle et mis à jour document par document
+SHARD_WORKERS = None
+WATCH_INTERVAL = 10.0
+# Sans surveillance du corpus, vérifier ses fichiers à chaque recherche (simple stat
+# des PDF s'ils n'ont pas changé). Désactivé dans les workers, que le maître relance.
+AUTO_REFRESH = True
+BATCH_MAX_SIZE = 16
+BATCH_MAX_WAIT_MS = 5.0
+# Encodeur factice déterministe à la place du modèle (tests de charge sans les poids)
+FAKE_ENCODER = os.environ.get("IANIS_FAKE_ENCODER", "0") != "0"
+FAKE_ENCODER_MS = float(os.environ.get("IANIS_FAKE_ENCODER_MS", FAKE_ENCODE_MS))
 
-def main(input_text):
+CORPUS = CorpusIndex(DIR, statement_prefix=STATEMENT_PREFIX)
+
+logger = logging.getLogger("ianis")
+
+
+def warmup(mode=MODE, watch=True):
+    """Charge le modèle du mode choisi et indexe le corpus avant la première requête."""
+    if not FAKE_ENCODER:
+        preload_models([MODELS[mode]])
+    CORPUS.refresh()
+    if watch:
+        CORPUS.watch(WATCH_INTERVAL)
+    statement_index(mode)
+    if BACKEND != "torch" and not FAKE_ENCODER:
+        check_backend(mode)
+
+
+def prefork(mode=MODE):
+    """
+    À appeler avant le fork des workers d'un serveur (ex. gunicorn --preload) : les
+    bibliothèques, le modèle et l'index sont chargés une fois et partagés par les workers.
+    La surveillance du corpus n'est pas lancée, les threads ne survivant pas au fork.
+    """
+    if not FAKE_ENCODER:
+        preload_libraries(BACKEND)
+    if BACKEND == "onnx" and not FAKE_ENCODER:
+        # Les sessions ONNX Runtime (et leurs threads) ne survivent pas au fork :
+        # elles sont créées dans chaque worker par postfork
+        preload_models([MODELS[mode]])
+        CORPUS.refresh()
+    else:
+        warmup(mode, watch=False)
+
+    # Les objets chargés sont exclus du ramasse-miettes : leurs en-têtes ne sont
+    # plus réécrits dans les workers, dont les pages restent partagées
+    gc.freeze()
+
+
+def watch_workers(mode=MODE, interval=WATCH_INTERVAL):
+    """
+    À appeler dans le processus maître d'un serveur à plusieurs workers, après prefork :
+    le corpus n'est surveillé qu'une fois, par le maître. À chaque changement, l'index est
+    reconstruit une seule fois dans le maître, puis les workers sont relancés (SIGHUP,
+    rechargement progressif de gunicorn) et héritent du nouvel état par le fork.
+    """
+    def reload_workers():
+        if BACKEND != "onnx":
+            statement_index(mode)
+        gc.freeze()
+        os.kill(os.getpid(), signal.SIGHUP)
+
+    CORPUS.watch(interval, on_change=reload_workers)
+
+
+def postfork(mode=MODE, num_threads=None, watch=False):
+    """
+    À appeler dans chaque worker juste après le fork.
+
+    Args:
+        mode: Mode servi par le worker
+        num_threads: Threads intra-op du worker (les workers se partagent les cœurs)
+        watch: Surveiller le corpus dans le worker (par défaut, le maître s'en charge :
+            voir watch_workers)
+    """
+    global NUM_THREADS, AUTO_REFRESH
+    if num_threads:
+        NUM_THREADS = num_threads
+        if BACKEND != "onnx" and not FAKE_ENCODER:
+            set_num_threads(num_threads)
+    if watch:
+        CORPUS.watch(WATCH_INTERVAL)
+    else:
+        # Corpus hérité du maître jusqu'à la relance du worker
+        AUTO_REFRESH = False
+    statement_index(mode)
+
+
+def check_backend(mode=MODE, n=32):
+    """Vérifie sur des énoncés du corpus que le moteur choisi donne les mêmes scores que float32."""
+    texts = [row["text"] for row in statement_index(mode).rows[:n]] or [MODELS[mode]]
+    encode, _ = ENCODERS[mode](MODELS[mode], BACKEND, NUM_THREADS)
+    reference, _ = ENCODERS[mode](MODELS[mode], "torch")
+
+    report = parity_check(encode, reference, texts)
+    logger.info("Parité %s / torch : %s", BACKEND, report)
+    return report
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def statement_index(mode=MODE):
+    """
+    Renvoie l'index global des énoncés pour un mode, reconstruit si le corpus a changé.
+    """
+    # Sans thread de surveillance (CLI, appel direct de main), les PDF ajoutés ou
+    # modifiés depuis le dernier passage sont pris en compte ici
+    if AUTO_REFRESH and not CORPUS.watching():
+        CORPUS.refresh()
+
+    with _indexes_lock:
+        index = _indexes.get(mode)
+        if index is None:
+            encode, store = mode_encoder(mode)
+            batcher = MicroBatcher(encode, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS)
+            if SHARDS:
+                check_shard_settings()
+                index = ShardedStatementIndex(encode, store, batcher, QueryCache(), SHARD_WORKERS)
+            else:
+                index = StatementIndex(encode, store, batcher, QueryCache(), COMPACT,
+                                       prefilter=PREFILTER, fusion=FUSION, top_sections=TOP_SECTIONS, dedup=DEDUP,
+                                       compact_exact=COMPACT_EXACT, name=f"mode{mode}")
+            _indexes[mode] = index
+            register_gauges(mode, index)
+        if index.version != CORPUS.version:
+            index.build(*CORPUS.snapshot())
+    return index
+
+
+def check_shard_settings():
+    """Refuse les réglages que l'index partitionné ne prend pas en charge (voir ShardedStatementIndex)."""
+    unsupported = {"COMPACT": COMPACT, "COMPACT_EXACT": COMPACT_EXACT, "PREFILTER": PREFILTER,
+                   "FUSION": FUSION, "TOP_SECTIONS": TOP_SECTIONS, "DEDUP": DEDUP}
+    names = [name for name, value in unsupported.items() if value]
+    if names:
+        raise ValueError(f"SHARDS cannot be combined with {', '.join(names)}")
+
+
+def mode_encoder(mode=MODE):
+    """Fonction d'encodage et stockage d'un mode, ou l'encodeur factice si FAKE_ENCODER."""
+    if FAKE_ENCODER:
+        return load_fake_encoder(MODELS[mode], delay_ms=FAKE_ENCODER_MS)
+    return ENCODERS[mode](MODELS[mode], BACKEND, NUM_THREADS)
+
+
+def register_gauges(mode, index):
+    """Expose la file d'attente d'encodage et les caches d'un index dans /metrics."""
+    labels = {"mode": mode}
+    metrics.register_gauge("ianis_statements", lambda: len(index), "Statements in the index.", labels)
+    metrics.register_gauge("ianis_batcher_queue_depth", lambda: index.batcher.queue_depth,
+                           "Query encodings waiting for a batch.", labels)
+    for level in ("embeddings", "results"):
+        cache = getattr(index.cache, level)
+        metrics.register_gauge(f"ianis_cache_{level}_hits", lambda cache=cache: cache.hits,
+                               f"Hits of the query {level} cache.", labels)
+        metrics.register_gauge(f"ianis_cache_{level}_misses", lambda cache=cache: cache.misses,
+                               f"Misses of the query {level} cache.", labels)
+
+
+def stats(mode=MODE):
+    """Compteurs du planificateur d'encodage et des caches pour un mode."""
+    index = statement_index(mode)
+    return {
+        "corpus_version": CORPUS.version,
+        "statements": len(index),
+        "vectors": index.vectors,
+        "batcher": index.batcher.stats(),
+        "cache": index.cache.stats(),
+    }
+
+
+def main(input_text, top_k=2, top_docs=2, min_score=None):
     # input_text = "Des outils de sauvegrade doivent etre mis en place pour restituer les données"
-    # input_text = "L'accès à distance au réseau interne doit se faire via une méthode sécurisée"
+    # input_text = "L'accès à distance au réseau interne doit se faire via une méthode sécurisée"
     # input_text = "Le développement de logiciels doit prendre en compte la minimisation de vulénrabilités en se basant sur des vulnérabilités connues"
 
-    paths = os.listdir(DIR)
+    Rs = {}
+    for doc, matches in main_iter(input_text, top_k, top_docs, min_score):
+        Rs[doc] = [match["text"] for match in matches]
 
-    # find most relevant files
-    mode = 1
-    relevant_files = search(input_text, [path[:-4] for path in paths], mode)
+    return Rs
 
-    Es = {}
-    Rs = {}
-    for pdf_path in relevant_files:
-        structure = extract_pdf(f"{DIR}/{pdf_path}.pdf")
 
-        # premier test en mappant tous les énnoncés
-        E = []
-        for es in structure.values():
-            for e in es:
-                E.append(f"{e['id']} {e['text']}")
+def main_iter(input_text, top_k=2, top_docs=2, min_score=None):
+    """
+    Variante de main qui renvoie les documents un par un, par pertinence décroissante.
 
-        Es[pdf_path] = E
+    Yields:
+        doc, matches: Nom du document et ses énoncés retenus (avec leur score)
+    """
+    # Un seul encodage de la question et un seul scoring sur tous les énoncés du corpus
+    for doc, matches in statement_index(MODE).search_iter(input_text, top_k, top_docs, min_score):
+        logger.info("%s : %s (scores %s)", doc, [match["text"] for match in matches],
+                    [round(match["score"], 4) for match in matches])
+        yield doc, matches
 
-        # find relevant statements
-        print(pdf_path, ":")
-        Rs[pdf_path] = search(input_text, E, mode)
 
-    return Rs
+def map_questions(questions, ids=None, top_k=2, top_docs=2, min_score=None):
+    """
+    Met en correspondance une liste de questions (ex. les exigences d'un référentiel)
+    avec les énoncés du corpus : encodage par lots et scoring matriciel.
+
+    Args:
+        questions: Liste des questions
+        ids: Identifiants des questions (par défaut leur numéro, à partir de 1)
+        top_k: Nombre d'énoncés à retourner par document
+        top_docs: Nombre de documents à retourner par question
+        min_score: Score minimal pour garder un énoncé (facultatif)
+
+    Returns:
+        mapping: Liste de lignes (question, rang, document, section, énoncé, score),
+            par question puis par pertinence décroissante
+    """
+    questions = list(questions)
+    ids = list(ids) if ids is not None else list(range(1, len(questions) + 1))
+    results = statement_index(MODE).search_batch(questions, top_k, top_docs, min_score)
+
+    mapping = []
+    for question_id, question, result in zip(ids, questions, results):
+        rank = 0
+        for doc, matches in result.items():
+            for match in matches:
+                rank += 1
+                mapping.append({
+                    "question_id": question_id,
+                    "question": question,
+                    "rank": rank,
+                    "doc": doc,
+                    "section": match["section"],
+                    "statement_id": match["id"],
+                    "score": match["score"],
+                    "statement": match["text"],
+                })
+    logger.info("%d questions mapped onto %d statements", len(questions), len(mapping))
+    return mapping
 
 
-def search(input_text, E, mode):
+def search(input_text, E, mode, top_k=2, min_score=None):
     ct = compare_texts if mode==1 else compare_texts2
-    textes_similaires, scores, indexes = ct(input_text, E)
+    textes_similaires, scores, indexes = ct(input_text, E, top_k=top_k, min_score=min_score)
     
-    for text in textes_similaires:
-        print(text)
-    print(f"Score de similarité : {scores}")
-    print("_"*30, '\n')
+    logger.info("%s (scores %s)", textes_similaires, scores)
 
     return textes_similaires
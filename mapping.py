@@ -0,0 +1,150 @@
+"""
+Mise en correspondance d'un référentiel complet (liste de questions) avec le corpus.
+
+Exemples :
+    python mapping.py exigences.csv --out mapping.csv
+    python mapping.py exigences.txt --format json --top-docs 3
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import ianis
+
+MAPPING_FIELDS = ["question_id", "question", "rank", "doc", "section", "statement_id", "score", "statement"]
+
+
+def parse_questions(text, fmt="txt"):
+    """
+    Lit une liste de questions.
+
+    Formats acceptés :
+        - csv : colonne "question" (et "id" facultative) si l'en-tête existe, sinon première colonne
+        - json : liste de textes ou d'objets {"id", "question"}, ou objet {"questions": [...]}
+        - txt : une question par ligne
+
+    Args:
+        text: Contenu à lire
+        fmt: "csv", "json" ou "txt"
+
+    Returns:
+        ids, questions: Identifiants (None si absents) et textes des questions
+
+    Raises:
+        ValueError: Si le contenu ne respecte pas le format attendu ou ne contient aucune question
+    """
+    if fmt == "json":
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}") from e
+        items = data.get("questions", []) if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            raise ValueError("Expected a list of questions")
+        for n, item in enumerate(items, 1):
+            if isinstance(item, dict):
+                if not isinstance(item.get("question"), str):
+                    raise ValueError(f"Question {n}: missing \"question\" text")
+            elif not isinstance(item, str):
+                raise ValueError(f"Question {n}: expected a text or an object with a \"question\" key")
+        ids = [item.get("id") if isinstance(item, dict) else None for item in items]
+        questions = [item["question"] if isinstance(item, dict) else item for item in items]
+    elif fmt == "csv":
+        try:
+            rows = [row for row in csv.reader(io.StringIO(text)) if row and any(cell.strip() for cell in row)]
+        except csv.Error as e:
+            raise ValueError(f"Invalid CSV: {e}") from e
+        header = [cell.strip().lower() for cell in rows[0]] if rows else []
+        if "question" in header:
+            column = header.index("question")
+            id_column = header.index("id") if "id" in header else None
+            rows = rows[1:]
+            width = max(column, id_column or 0) + 1
+            for n, row in enumerate(rows, 2):
+                if len(row) < width:
+                    raise ValueError(f"CSV row {n}: expected at least {width} columns, got {len(row)}")
+            ids = [row[id_column] if id_column is not None else None for row in rows]
+            questions = [row[column] for row in rows]
+        else:
+            ids = [None] * len(rows)
+            questions = [row[0] for row in rows]
+    else:
+        questions = [line for line in text.splitlines() if line.strip()]
+        ids = [None] * len(questions)
+
+    questions = [question.strip() for question in questions]
+    if not any(questions):
+        raise ValueError("No questions")
+    if all(question_id is None for question_id in ids):
+        ids = None
+    return ids, questions
+
+
+def question_format(filename):
+    """Format d'un fichier de questions d'après son extension."""
+    extension = os.path.splitext(filename)[1].lower().lstrip(".")
+    return extension if extension in ("csv", "json") else "txt"
+
+
+def read_questions(path):
+    """Lit un fichier de questions (voir parse_questions)."""
+    with open(path, encoding="utf-8-sig") as f:
+        return parse_questions(f.read(), question_format(path))
+
+
+def format_mapping(mapping, fmt="csv"):
+    """
+    Sérialise une table de correspondance.
+
+    Args:
+        mapping: Lignes renvoyées par ianis.map_questions
+        fmt: "csv" ou "json"
+
+    Returns:
+        text: Contenu CSV ou JSON
+    """
+    if fmt == "json":
+        return json.dumps(mapping, ensure_ascii=False, indent=2)
+
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=MAPPING_FIELDS)
+    writer.writeheader()
+    writer.writerows(mapping)
+    return output.getvalue()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mise en correspondance d'une liste de questions avec le corpus")
+    parser.add_argument("questions", help="Fichier de questions (.csv, .json ou une question par ligne)")
+    parser.add_argument("--out", help="Fichier de sortie (sinon sortie standard)")
+    parser.add_argument("--format", choices=["csv", "json"], help="Format de sortie (par défaut d'après --out, sinon csv)")
+    parser.add_argument("--mode", type=int, choices=sorted(ianis.MODELS), default=ianis.MODE)
+    parser.add_argument("--top-k", type=int, default=2, help="Énoncés par document")
+    parser.add_argument("--top-docs", type=int, default=2, help="Documents par question")
+    parser.add_argument("--min-score", type=float)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fmt = args.format or ("json" if args.out and args.out.lower().endswith(".json") else "csv")
+
+    try:
+        ids, questions = read_questions(args.questions)
+    except ValueError as e:
+        sys.exit(f"{args.questions}: {e}")
+    ianis.MODE = args.mode
+    mapping = ianis.map_questions(questions, ids, args.top_k, args.top_docs, args.min_score)
+    output = format_mapping(mapping, fmt)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,16 @@
+from .registry import *
+from .backends import *
+from .encoder import *
+from .store import *
+from .scoring import *
+from .matrix import *
+from .statements import *
+from .shards import *
+from .batcher import *
+from .cache import *
+from .lexical import *
+from .sections import *
+from .dedup import *
+from .fake import *
 from .embedding import *
 from .embeddingV2 import *
\ No newline at end of file
@@ -0,0 +1,238 @@
+import os
+import threading
+import numpy as np
+from .registry import get_model
+
+BACKEND = "torch"
+ONNX_DIR = ".cache/onnx"
+
+
+class TorchBackend:
+    """
+    Exécution du modèle avec PyTorch en float32, sous torch.inference_mode().
+    Tous les moteurs exposent la même interface : run(features) -> états cachés.
+
+    Le nombre de threads de PyTorch est un réglage du processus, fixé par
+    set_num_threads et non par le moteur.
+    """
+
+    name = "torch"
+
+    def __init__(self, model):
+        """
+        Args:
+            model: Modèle transformers (AutoModel)
+        """
+        self.model = model
+        self.hidden_size = model.config.hidden_size
+
+    def run(self, features):
+        """
+        Exécute le modèle sur un lot déjà tokenisé et paddé.
+
+        Args:
+            features: Dictionnaire nom d'entrée -> tableau NumPy (B, T)
+
+        Returns:
+            hidden_states: Tableau float32 (B, T, D) de la dernière couche
+        """
+        import torch
+
+        inputs = {key: torch.from_numpy(np.asarray(value)) for key, value in features.items()}
+        with torch.inference_mode():
+            outputs = self.model(**inputs)
+        return outputs.last_hidden_state.float().numpy()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """
+    Exécution PyTorch avec les couches linéaires quantifiées dynamiquement en int8.
+    Le modèle partagé du registre n'est pas modifié (copie quantifiée).
+    """
+
+    name = "torch-int8"
+
+    def __init__(self, model):
+        import torch
+
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        super().__init__(quantized)
+
+
+def _export_wrapper(model, input_names):
+    """Adapte un modèle transformers à l'export ONNX (entrées positionnelles, sortie unique)."""
+    import torch
+
+    class ExportWrapper(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    return ExportWrapper()
+
+
+class OnnxBackend:
+    """
+    Exécution avec ONNX Runtime d'un export du modèle en cache local.
+    L'export est fait une seule fois dans ONNX_DIR puis réutilisé.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name, tokenizer, model, num_threads=None, directory=ONNX_DIR):
+        """
+        Args:
+            model_name: Nom du modèle (sert à nommer le fichier exporté)
+            tokenizer: Le tokenizer du modèle
+            model: Modèle transformers à exporter
+            num_threads: Nombre de threads intra-op d'ONNX Runtime (facultatif)
+            directory: Dossier des exports ONNX
+        """
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The onnx backend requires the onnxruntime package") from e
+
+        self.hidden_size = model.config.hidden_size
+        self.path = os.path.join(directory, model_name.replace("/", "--") + ".onnx")
+        self.input_names = [name for name in tokenizer.model_input_names
+                            if name in tokenizer("exemple", return_tensors="np")]
+
+        if not os.path.exists(self.path):
+            self.export(tokenizer, model)
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+
+    def export(self, tokenizer, model):
+        """Exporte le modèle au format ONNX avec des axes dynamiques (lot, séquence)."""
+        import torch
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        dummy = tokenizer(["exemple de texte", "exemple"], padding=True, return_tensors="pt")
+        axes = {name: {0: "batch", 1: "sequence"} for name in self.input_names}
+        axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        tmp_path = self.path + ".tmp"
+        with torch.inference_mode():
+            torch.onnx.export(
+                _export_wrapper(model, self.input_names).eval(),
+                tuple(dummy[name] for name in self.input_names),
+                tmp_path,
+                input_names=self.input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=axes,
+                opset_version=17,
+                dynamo=False,
+            )
+        os.replace(tmp_path, self.path)
+
+    def run(self, features):
+        """Même interface que TorchBackend.run."""
+        inputs = {name: np.asarray(features[name], dtype=np.int64) for name in self.input_names}
+        return self.session.run(["last_hidden_state"], inputs)[0].astype(np.float32, copy=False)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def create_backend(backend, model_name, num_threads=None):
+    """
+    Crée un moteur d'exécution pour un modèle du registre.
+
+    Args:
+        backend: "torch", "torch-int8" ou "onnx"
+        model_name: Nom du modèle
+        num_threads: Nombre de threads intra-op d'ONNX Runtime (facultatif ; ignoré par
+            PyTorch, voir set_num_threads)
+    """
+    tokenizer, model = get_model(model_name)
+    if backend == "torch":
+        return TorchBackend(model)
+    if backend == "torch-int8":
+        return QuantizedTorchBackend(model)
+    if backend == "onnx":
+        return OnnxBackend(model_name, tokenizer, model, num_threads)
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def get_backend(model_name, backend=BACKEND, num_threads=None):
+    """
+    Renvoie le moteur partagé pour (modèle, backend, threads), créé au premier appel.
+    Les moteurs PyTorch ne dépendent pas du nombre de threads : un seul par (modèle, backend).
+    """
+    key = (model_name, backend, num_threads if backend == "onnx" else None)
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = create_backend(backend, model_name, num_threads)
+        return _backends[key]
+
+
+def preload_libraries(backend=BACKEND):
+    """
+    Importe à l'avance les bibliothèques d'un moteur d'exécution.
+
+    Le paquet n'importe torch, transformers et onnxruntime qu'au premier encodage ;
+    à appeler avant un fork (serveur à plusieurs workers) pour que les workers
+    partagent ces modules au lieu de les importer chacun.
+
+    Args:
+        backend: "torch", "torch-int8" ou "onnx"
+    """
+    import torch
+    import transformers
+
+    if backend == "onnx":
+        import onnxruntime
+
+
+def set_num_threads(num_threads):
+    """
+    Fixe le nombre de threads intra-op de PyTorch pour le processus courant, par
+    exemple dans chaque worker d'un serveur pour ne pas dépasser le nombre de cœurs.
+    Les sessions ONNX Runtime reçoivent le leur à leur création (voir get_backend).
+    """
+    import torch
+
+    torch.set_num_threads(num_threads)
+
+
+def as_backend(model):
+    """Accepte indifféremment un moteur ou un modèle PyTorch (exécuté tel quel)."""
+    return model if hasattr(model, "run") else TorchBackend(model)
+
+
+def parity_check(encode, reference_encode, texts, tolerance=0.02):
+    """
+    Compare un moteur optimisé à la référence float32 sur des textes d'exemple.
+
+    Les deux encodeurs produisent des matrices de vecteurs normalisés ; on compare
+    la similarité cosinus de chaque vecteur avec sa référence, ainsi que la matrice
+    des scores entre textes (ce que voit réellement la recherche).
+
+    Args:
+        encode: Fonction liste de textes -> matrice (N, D) du moteur testé
+        reference_encode: Même fonction avec le moteur float32 de référence
+        texts: Textes d'exemple
+        tolerance: Écart maximal accepté sur les scores
+
+    Returns:
+        report: Dictionnaire (cosinus minimal, écart maximal des scores, ok)
+    """
+    vectors = encode(texts)
+    reference = reference_encode(texts)
+
+    cosines = np.sum(vectors * reference, axis=1)
+    score_error = np.abs(vectors @ vectors.T - reference @ reference.T).max()
+    return {
+        "min_cosine": float(cosines.min()),
+        "max_score_error": float(score_error),
+        "ok": bool(score_error <= tolerance),
+    }
@@ -0,0 +1,123 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 5.0
+
+
+class MicroBatcher:
+    """
+    Regroupe les textes soumis par plusieurs threads (requêtes concurrentes) pour
+    les encoder en une seule passe du modèle.
+
+    Le premier texte reçu ouvre un lot ; le lot part dès qu'il contient
+    max_batch_size textes, que max_wait_ms se sont écoulées, ou qu'aucun autre texte
+    n'est soumis ou en attente (une requête seule n'attend pas). Chaque appelant
+    récupère son vecteur via un Future.
+    """
+
+    def __init__(self, encode, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        """
+        Args:
+            encode: Fonction liste de textes -> matrice (N, D) de vecteurs
+            max_batch_size: Nombre maximal de textes par passe
+            max_wait_ms: Attente maximale (ms) pour compléter un lot
+        """
+        self.encode_batch = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        # Textes soumis dont le vecteur n'est pas encore rendu
+        self._in_flight = 0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self):
+        """Nombre de textes en attente d'encodage."""
+        return self._queue.qsize()
+
+    def stats(self):
+        """Compteurs du planificateur (file d'attente, lots, textes, taille moyenne des lots)."""
+        return {
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+    def _start(self):
+        """Démarre le thread d'encodage au premier appel."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, text):
+        """
+        Soumet un texte à encoder.
+
+        Returns:
+            future: Future dont le résultat est le vecteur du texte
+        """
+        with self._lock:
+            self._in_flight += 1
+        self._start()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text):
+        """Encode un texte en passant par le regroupement (bloquant)."""
+        return self.submit(text).result()
+
+    def _collect(self):
+        """
+        Attend le premier texte puis complète le lot jusqu'à la taille ou au délai
+        maximal, tant que d'autres textes sont soumis.
+        """
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            with self._lock:
+                if self._in_flight <= len(batch):
+                    break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Boucle du thread d'encodage."""
+        while True:
+            batch = self._collect()
+            texts = [text for text, _ in batch]
+            futures = [future for _, future in batch]
+
+            try:
+                vectors = self.encode_batch(texts)
+            except Exception as e:
+                vectors = None
+                error = e
+
+            with self._lock:
+                self._in_flight -= len(batch)
+            if vectors is None:
+                for future in futures:
+                    future.set_exception(error)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            for future, vector in zip(futures, vectors):
+                future.set_result(vector)
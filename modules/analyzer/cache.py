@@ -0,0 +1,151 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+EMBEDDING_CACHE_SIZE = 4096
+RESULT_CACHE_SIZE = 1024
+CACHE_TTL = 3600.0
+
+
+def normalize_query(text):
+    """
+    Normalise une question pour que ses variantes triviales partagent la même entrée
+    de cache. Seuls les espaces sont normalisés : le modèle distingue la casse et la
+    ponctuation ("SI" et "si" n'ont pas le même vecteur), qui sont donc conservées.
+    """
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class LRUCache:
+    """
+    Cache borné avec éviction LRU et durée de vie (TTL) des entrées.
+    Compte les succès et les échecs de lecture.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """
+        Args:
+            maxsize: Nombre maximal d'entrées
+            ttl: Durée de vie d'une entrée en secondes (None : illimitée)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Renvoie la valeur associée à key si elle est présente et non expirée."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Ajoute une entrée, en évinçant la moins récemment utilisée si le cache est plein."""
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Vide le cache (les compteurs sont conservés)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Compteurs du cache."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class QueryCache:
+    """
+    Cache à deux niveaux pour les questions :
+    - question normalisée -> embedding
+    - (question, version du corpus, paramètres de recherche) -> résultats classés
+
+    Les résultats sont invalidés dès que la version du corpus change ; les
+    embeddings, qui ne dépendent que du modèle, sont conservés.
+    """
+
+    def __init__(self, embedding_size=EMBEDDING_CACHE_SIZE, result_size=RESULT_CACHE_SIZE, ttl=CACHE_TTL):
+        """
+        Args:
+            embedding_size: Nombre maximal d'embeddings conservés
+            result_size: Nombre maximal de résultats conservés
+            ttl: Durée de vie d'une entrée en secondes
+        """
+        self.embeddings = LRUCache(embedding_size, ttl)
+        self.results = LRUCache(result_size, ttl)
+        self.version = None
+
+    def embedding(self, query, compute):
+        """
+        Renvoie l'embedding d'une question, calculé par compute(query) en cas d'absence.
+        """
+        key = normalize_query(query)
+        vector = self.embeddings.get(key)
+        if vector is None:
+            vector = compute(query)
+            self.embeddings.put(key, vector)
+        return vector
+
+    def result(self, query, version, params, compute):
+        """
+        Renvoie les résultats d'une recherche, calculés par compute() en cas d'absence.
+
+        Args:
+            query: Question posée
+            version: Version du corpus interrogé
+            params: Paramètres de la recherche (tuple hashable : mode, top_k, ...)
+            compute: Fonction sans argument qui effectue la recherche
+        """
+        results = self.get_result(query, version, params)
+        if results is None:
+            results = compute()
+            self.put_result(query, version, params, results)
+        return results
+
+    def get_result(self, query, version, params):
+        """Renvoie les résultats en cache d'une recherche, ou None."""
+        self.check_version(version)
+        return self.results.get((normalize_query(query), version, params))
+
+    def put_result(self, query, version, params, results):
+        """Met en cache les résultats complets d'une recherche."""
+        self.check_version(version)
+        self.results.put((normalize_query(query), version, params), results)
+
+    def check_version(self, version):
+        """Vide les résultats si la version du corpus a changé."""
+        if version != self.version:
+            self.results.clear()
+            self.version = version
+
+    def stats(self):
+        """Compteurs des deux niveaux de cache."""
+        return {
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+        }
@@ -0,0 +1,138 @@
+import zlib
+import numpy as np
+from .lexical import WORD_PATTERN, fold_text
+from .scoring import top_k_indices
+
+# Similarité de Jaccard (estimée sur les signatures) à partir de laquelle deux énoncés sont fusionnés
+DEDUP_THRESHOLD = 0.8
+DEDUP_SHINGLE_SIZE = 3
+MINHASH_PERMUTATIONS = 64
+# 8 bandes de 8 valeurs : deux textes de similarité 0.8 partagent une bande avec une probabilité > 0.99
+LSH_BANDS = 8
+MINHASH_PRIME = (1 << 31) - 1
+
+
+def text_shingles(text, size=DEDUP_SHINGLE_SIZE):
+    """
+    Ensemble des suites de size mots consécutifs d'un texte normalisé (replié, sans
+    ponctuation), sous forme d'empreintes entières stables d'un processus à l'autre.
+
+    Args:
+        text: Texte de l'énoncé
+        size: Nombre de mots par suite
+
+    Returns:
+        shingles: Tableau d'empreintes uniques (vide si le texte n'a aucun mot)
+    """
+    words = WORD_PATTERN.findall(fold_text(text))
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.array([zlib.crc32(gram.encode("utf-8")) for gram in grams], dtype=np.uint64))
+
+
+def minhash_signatures(texts, permutations=MINHASH_PERMUTATIONS, seed=0):
+    """
+    Signatures MinHash des textes : pour chaque permutation (a * x + b mod p), le
+    minimum sur les suites de mots du texte.
+
+    Returns:
+        signatures: Matrice (N, permutations) ; None pour les textes sans mot
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MINHASH_PRIME, permutations, dtype=np.uint64)
+    b = rng.integers(0, MINHASH_PRIME, permutations, dtype=np.uint64)
+
+    signatures = []
+    for text in texts:
+        shingles = text_shingles(text) % MINHASH_PRIME
+        if not len(shingles):
+            signatures.append(None)
+            continue
+        signatures.append(((np.outer(shingles, a) + b) % MINHASH_PRIME).min(axis=0))
+    return signatures
+
+
+def near_duplicate_groups(texts, threshold=DEDUP_THRESHOLD, bands=LSH_BANDS):
+    """
+    Regroupe les textes quasi identiques (MinHash et LSH par bandes).
+
+    Les textes qui partagent une bande de leur signature sont candidats ; chacun est
+    comparé au premier texte de la bande, et fusionné avec lui si la part de valeurs
+    communes de leurs signatures (estimation de Jaccard) atteint le seuil.
+
+    Args:
+        texts: Textes des énoncés
+        threshold: Similarité minimale pour fusionner deux textes
+        bands: Nombre de bandes de la signature
+
+    Returns:
+        groups: Indice du groupe de chaque texte ; les groupes sont numérotés dans
+            l'ordre de leur premier texte, qui en est le représentant
+    """
+    signatures = minhash_signatures(texts)
+    parents = list(range(len(texts)))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    buckets = {}
+    for i, signature in enumerate(signatures):
+        if signature is None:
+            continue
+        for band, values in enumerate(np.array_split(signature, bands)):
+            first = buckets.setdefault((band, values.tobytes()), i)
+            if first == i or find(first) == find(i):
+                continue
+            if np.mean(signatures[first] == signature) >= threshold:
+                # Le plus ancien texte reste la racine, donc le représentant du groupe
+                a, b = sorted((find(first), find(i)))
+                parents[b] = a
+
+    groups, numbers = [], {}
+    for i in range(len(texts)):
+        groups.append(numbers.setdefault(find(i), len(numbers)))
+    return np.array(groups, dtype=np.int64)
+
+
+class GroupedScorer:
+    """
+    Vue d'un scorer dont plusieurs lignes partagent le même vecteur : la matrice ne
+    contient qu'un vecteur par groupe de quasi-doublons et chaque ligne logique est
+    associée au vecteur de son groupe. Les scores sont calculés sur les groupes puis
+    recopiés sur les lignes.
+    """
+
+    def __init__(self, scorer, groups):
+        """
+        Args:
+            scorer: Scorer (ou CompactMatrix) sur les vecteurs des groupes
+            groups: Indice du groupe de chaque ligne (voir near_duplicate_groups)
+        """
+        self.scorer = scorer
+        self.groups = np.asarray(groups, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def scores(self, queries):
+        """Scores de toutes les lignes (voir Scorer.scores)."""
+        return self.scorer.scores(queries)[..., self.groups]
+
+    def take(self, indices):
+        """Renvoie les vecteurs de quelques lignes."""
+        return self.scorer.take(self.groups[indices])
+
+    def rescore(self, query, indices):
+        """Renvoie les scores exacts de quelques lignes."""
+        return self.scorer.rescore(query, self.groups[indices])
+
+    def top_k(self, query, top_k=2, min_score=None):
+        """Renvoie les lignes les plus similaires à une requête (voir Scorer.top_k)."""
+        scores = self.scores(query)
+        indices = top_k_indices(scores, top_k, min_score)
+        return indices, scores[indices].tolist()
@@ -1,10 +1,14 @@
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import torch
-from transformers import AutoTokenizer, AutoModel
+from .registry import get_model
+from .encoder import encode_batch, DEFAULT_MAX_BATCH_TOKENS
+from .store import get_store
+from .backends import get_backend, BACKEND
+from .scoring import Scorer
 
+DEFAULT_MODEL = "sentence-transformers/distiluse-base-multilingual-cased-v2"
 
-def load_model(model_name="sentence-transformers/distiluse-base-multilingual-cased-v2"):
+
+def load_model(model_name=DEFAULT_MODEL):
     """
     Charge le modèle de génération d'embeddings et son tokenizer.
     
@@ -14,6 +18,8 @@ def load_model(model_name="sentence-transformers/distiluse-base-multilingual-cas
     Returns:
         tokenizer, model: Le tokenizer et le modèle chargés
     """
+    from transformers import AutoTokenizer, AutoModel
+
     tokenizer = AutoTokenizer.from_pretrained(model_name)
     model = AutoModel.from_pretrained(model_name)
     return tokenizer, model
@@ -31,6 +37,8 @@ def get_embedding(text, tokenizer, model):
     Returns:
         embedding: Vecteur d'embedding normalisé
     """
+    import torch
+
     # Tokenisation avec gestion de la longueur maximale
     inputs = tokenizer(text, padding=True, truncation=True, return_tensors="pt", max_length=512)
     
@@ -51,7 +59,42 @@ def get_embedding(text, tokenizer, model):
     return embedding
 
 
-def find_most_similar(input_text, text_list, tokenizer, model, top_k=2):
+def get_embeddings(text_list, tokenizer, model, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS):
+    """
+    Génère les embeddings d'une liste de textes par lots regroupés par longueur.
+    
+    Args:
+        text_list: Les textes à transformer en embeddings
+        tokenizer: Le tokenizer du modèle
+        model: Le modèle de génération d'embeddings
+        max_batch_tokens: Budget de tokens (padding compris) par lot
+        
+    Returns:
+        embeddings: Matrice (N, D) de vecteurs normalisés (moyenne des tokens)
+    """
+    return encode_batch(text_list, tokenizer, model, pooling="mean", max_batch_tokens=max_batch_tokens)
+
+
+def load_encoder(model_name=DEFAULT_MODEL, backend=BACKEND, num_threads=None):
+    """
+    Renvoie une fonction d'encodage par lots reposant sur le modèle partagé.
+    
+    Args:
+        model_name: Nom du modèle à utiliser
+        backend: Moteur d'exécution ("torch", "torch-int8" ou "onnx")
+        num_threads: Nombre de threads intra-op d'ONNX Runtime (facultatif ; pour PyTorch, voir set_num_threads)
+        
+    Returns:
+        encode, store: La fonction liste de textes -> matrice (N, D) et le stockage associé
+    """
+    tokenizer, model = get_model(model_name)
+    engine = get_backend(model_name, backend, num_threads)
+    # Les vecteurs d'un moteur quantifié diffèrent légèrement : stockage séparé
+    pooling = "mean" if backend == "torch" else f"mean-{backend}"
+    return (lambda text_list: get_embeddings(text_list, tokenizer, engine)), get_store(model_name, pooling)
+
+
+def find_most_similar(input_text, text_list, tokenizer, model, top_k=2, store=None, min_score=None):
     """
     Trouve les textes les plus similaires à un texte d'entrée.
     
@@ -61,6 +104,8 @@ def find_most_similar(input_text, text_list, tokenizer, model, top_k=2):
         tokenizer: Le tokenizer du modèle
         model: Le modèle de génération d'embeddings
         top_k: Nombre de résultats similaires à retourner
+        store: Stockage d'embeddings déjà calculés (facultatif)
+        min_score: Score minimal pour garder un résultat (facultatif)
         
     Returns:
         similar_indices, similarities: Indices des textes les plus similaires et leurs scores
@@ -68,19 +113,18 @@ def find_most_similar(input_text, text_list, tokenizer, model, top_k=2):
     # Génération de l'embedding du texte d'entrée
     input_embedding = get_embedding(input_text, tokenizer, model)
     
-    # Génération des embeddings pour tous les textes de la liste
-    text_embeddings = [get_embedding(text, tokenizer, model) for text in text_list]
-    
-    # Calcul des similarités cosinus
-    similarities = [cosine_similarity([input_embedding], [text_emb])[0][0] for text_emb in text_embeddings]
-    
-    # Tri des similarités par ordre décroissant
-    similar_indices = np.argsort(similarities)[::-1][:top_k]
+    # Génération des embeddings pour tous les textes de la liste, par lots
+    # (seuls les textes absents du stockage sont encodés)
+    if store is not None:
+        text_embeddings = store.get_or_encode(text_list, lambda texts: get_embeddings(texts, tokenizer, model))
+    else:
+        text_embeddings = get_embeddings(text_list, tokenizer, model)
     
-    return similar_indices, [similarities[i] for i in similar_indices]
+    # Similarité cosinus (produit scalaire de vecteurs normalisés) et sélection des top_k
+    return Scorer(text_embeddings).top_k(input_embedding, top_k, min_score)
 
 
-def compare_texts(input_text, text_list, model_name=None):
+def compare_texts(input_text, text_list, model_name=None, top_k=2, min_score=None):
     """
     Compare un texte d'entrée avec une liste de textes et renvoie le plus similaire.
     
@@ -88,15 +132,19 @@ def compare_texts(input_text, text_list, model_name=None):
         input_text: Le texte d'entrée à comparer
         text_list: La liste des textes à comparer
         model_name: Nom du modèle à utiliser (facultatif)
+        top_k: Nombre de résultats à retourner
+        min_score: Score minimal pour garder un résultat (facultatif)
         
     Returns:
         most_similar_text, similarity: Le texte le plus similaire et son score
     """
-    # Chargement du modèle
-    tokenizer, model = load_model(model_name) if model_name else load_model()
+    # Récupération du modèle partagé (chargé une seule fois par processus)
+    model_name = model_name or DEFAULT_MODEL
+    tokenizer, model = get_model(model_name)
 
     # Recherche du texte le plus similaire
-    similar_indices, similarities = find_most_similar(input_text, text_list, tokenizer, model)
+    store = get_store(model_name, "mean")
+    similar_indices, similarities = find_most_similar(input_text, text_list, tokenizer, model, top_k, store, min_score)
     
     # Récupération du résultat
     # most_similar_index = similar_indices[0]
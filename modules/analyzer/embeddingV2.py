@@ -1,9 +1,15 @@
+import logging
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import torch
-from transformers import AutoTokenizer, AutoModel
+from .registry import get_model
+from .encoder import encode_batch, DEFAULT_MAX_BATCH_TOKENS
+from .store import get_store
+from .backends import get_backend, BACKEND
+from .scoring import Scorer
 
 MODEL = "BAAI/bge-large-en-v1.5"
+INSTRUCTION = "Represent this sentence for searching relevant passages: "
+
+logger = logging.getLogger(__name__)
 
 
 def load_model(model_name):
@@ -19,7 +25,9 @@ def load_model(model_name):
     Returns:
         tokenizer, model: The loaded tokenizer and model
     """
-    print(model_name)
+    from transformers import AutoTokenizer, AutoModel
+
+    logger.info("Loading %s", model_name)
     tokenizer = AutoTokenizer.from_pretrained(model_name)
     model = AutoModel.from_pretrained(model_name)
     return tokenizer, model
@@ -39,12 +47,12 @@ def get_embedding(text, tokenizer, model):
     Returns:
         embedding: Normalized embedding vector
     """
+    import torch
+
     # BGE models work best with an instruction prefix for retrieval tasks
-    instruction = "Represent this sentence for searching relevant passages: "
-    
     # Prepend instruction to the text if it's not already included
-    if not text.startswith(instruction):
-        text = instruction + text
+    if not text.startswith(INSTRUCTION):
+        text = INSTRUCTION + text
     
     # Tokenize with handling of maximum length
     inputs = tokenizer(text, padding=True, truncation=True, return_tensors="pt", max_length=512)
@@ -62,7 +70,43 @@ def get_embedding(text, tokenizer, model):
     
     return embedding
 
-def find_most_similar(input_text, text_list, tokenizer, model, top_k=2):
+def get_embeddings(text_list, tokenizer, model, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS):
+    """
+    Generates embeddings for a list of texts in length-bucketed batches.
+    
+    Each text gets the same instruction prefix and [CLS] pooling as get_embedding.
+    
+    Args:
+        text_list: The texts to transform into embeddings
+        tokenizer: The model's tokenizer
+        model: The embedding generation model
+        max_batch_tokens: Token budget (padding included) per batch
+        
+    Returns:
+        embeddings: (N, D) matrix of normalized vectors
+    """
+    texts = [text if text.startswith(INSTRUCTION) else INSTRUCTION + text for text in text_list]
+    return encode_batch(texts, tokenizer, model, pooling="cls", max_batch_tokens=max_batch_tokens)
+
+def load_encoder2(model_name=MODEL, backend=BACKEND, num_threads=None):
+    """
+    Returns a batch encoding function backed by the shared model.
+    
+    Args:
+        model_name: Name of the model to use
+        backend: Execution backend ("torch", "torch-int8" or "onnx")
+        num_threads: Number of intra-op threads of ONNX Runtime (optional; for PyTorch, see set_num_threads)
+        
+    Returns:
+        encode, store: The texts -> (N, D) matrix function and its embedding store
+    """
+    tokenizer, model = get_model(model_name)
+    engine = get_backend(model_name, backend, num_threads)
+    # Vectors from a quantized backend differ slightly: keep them in a separate store
+    pooling = "cls" if backend == "torch" else f"cls-{backend}"
+    return (lambda text_list: get_embeddings(text_list, tokenizer, engine)), get_store(model_name, pooling)
+
+def find_most_similar(input_text, text_list, tokenizer, model, top_k=2, store=None, min_score=None):
     """
     Finds the most similar texts to an input text using BGE embeddings.
     
@@ -72,6 +116,8 @@ def find_most_similar(input_text, text_list, tokenizer, model, top_k=2):
         tokenizer: The model's tokenizer
         model: The embedding generation model
         top_k: Number of similar results to return
+        store: Store of already computed embeddings (optional)
+        min_score: Minimum score for a result to be kept (optional)
         
     Returns:
         similar_indices, similarities: Indices of the most similar texts and their scores
@@ -79,18 +125,17 @@ def find_most_similar(input_text, text_list, tokenizer, model, top_k=2):
     # Generate embedding for the input text
     input_embedding = get_embedding(input_text, tokenizer, model)
     
-    # Generate embeddings for all texts in the list
-    text_embeddings = [get_embedding(text, tokenizer, model) for text in text_list]
-    
-    # Calculate cosine similarities
-    similarities = [cosine_similarity([input_embedding], [text_emb])[0][0] for text_emb in text_embeddings]
-    
-    # Sort similarities in descending order
-    similar_indices = np.argsort(similarities)[::-1][:top_k]
+    # Generate embeddings for all texts in the list, in batches
+    # (only texts missing from the store are encoded)
+    if store is not None:
+        text_embeddings = store.get_or_encode(text_list, lambda texts: get_embeddings(texts, tokenizer, model))
+    else:
+        text_embeddings = get_embeddings(text_list, tokenizer, model)
     
-    return similar_indices, [similarities[i] for i in similar_indices]
+    # Cosine similarity (dot product of normalized vectors) and top_k selection
+    return Scorer(text_embeddings).top_k(input_embedding, top_k, min_score)
 
-def compare_texts2(input_text, text_list, model_name=MODEL):
+def compare_texts2(input_text, text_list, model_name=MODEL, top_k=2, min_score=None):
     """
     Compares an input text with a list of texts and returns the most similar ones.
     
@@ -101,16 +146,19 @@ def compare_texts2(input_text, text_list, model_name=MODEL):
         input_text: The input text to compare
         text_list: The list of texts to compare against
         model_name: Name of the model to use (default is BGE English base model)
+        top_k: Number of results to return
+        min_score: Minimum score for a result to be kept (optional)
         
     Returns:
         similar_texts, similarities, similar_indices: The most similar texts, 
         their similarity scores, and their indices in the original list
     """
-    # Load the model
-    tokenizer, model = load_model(model_name)
+    # Get the shared model (loaded once per process)
+    tokenizer, model = get_model(model_name)
     
     # Find the most similar texts
-    similar_indices, similarities = find_most_similar(input_text, text_list, tokenizer, model)
+    store = get_store(model_name, "cls")
+    similar_indices, similarities = find_most_similar(input_text, text_list, tokenizer, model, top_k, store, min_score)
     
     # Return the results
     return [text_list[i] for i in similar_indices], similarities, similar_indices
\ No newline at end of file
@@ -0,0 +1,94 @@
+import numpy as np
+from .backends import as_backend
+
+DEFAULT_MAX_BATCH_TOKENS = 8192
+
+
+def make_batches(lengths, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS):
+    """
+    Regroupe les textes par longueur de tokens croissante en lots dont le coût
+    après padding (taille du lot x plus grande longueur) reste sous le budget.
+
+    Args:
+        lengths: Nombre de tokens de chaque texte
+        max_batch_tokens: Budget de tokens (padding compris) par lot
+
+    Returns:
+        batches: Liste de listes d'indices dans l'ordre d'origine
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+
+    batches = []
+    batch = []
+    for i in order:
+        # Les longueurs sont triées : le texte courant est le plus long du lot
+        if batch and (len(batch) + 1) * lengths[i] > max_batch_tokens:
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def pool(hidden_states, attention_mask, pooling="mean"):
+    """
+    Réduit les états cachés d'un lot à un vecteur par texte.
+
+    Args:
+        hidden_states: Tableau (B, T, D) de la dernière couche
+        attention_mask: Masque (B, T) des tokens réels
+        pooling: "mean" (moyenne des tokens) ou "cls" (premier token)
+
+    Returns:
+        embeddings: Tableau (B, D)
+    """
+    if pooling == "cls":
+        return hidden_states[:, 0, :]
+    if pooling == "mean":
+        # Moyenne sur les seuls tokens réels, pour ne pas dépendre du padding du lot
+        mask = attention_mask[:, :, None].astype(hidden_states.dtype)
+        return (hidden_states * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1)
+    raise ValueError(f"Unknown pooling mode: {pooling}")
+
+
+def encode_batch(texts, tokenizer, model, pooling="mean", max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, max_length=512):
+    """
+    Génère les embeddings normalisés d'une liste de textes en un minimum de passes.
+
+    Les textes sont triés par longueur et répartis en lots sous un budget de tokens,
+    le padding n'étant appliqué qu'à l'intérieur de chaque lot.
+
+    Args:
+        texts: Liste des textes à encoder
+        tokenizer: Le tokenizer du modèle
+        model: Moteur d'exécution (voir backends) ou modèle PyTorch
+        pooling: Mode de réduction ("mean" ou "cls")
+        max_batch_tokens: Budget de tokens (padding compris) par lot
+        max_length: Longueur maximale d'un texte en tokens
+
+    Returns:
+        embeddings: Matrice float32 (N, D) de vecteurs normalisés, dans l'ordre de texts
+    """
+    backend = as_backend(model)
+    embeddings = np.zeros((len(texts), backend.hidden_size), dtype=np.float32)
+    if not texts:
+        return embeddings
+
+    # Tokenisation unique, sans padding, pour connaître la longueur de chaque texte
+    encoded = tokenizer(list(texts), truncation=True, max_length=max_length)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+
+    for batch in make_batches(lengths, max_batch_tokens):
+        features = [{key: encoded[key][i] for key in encoded.keys()} for i in batch]
+        inputs = dict(tokenizer.pad(features, padding=True, return_tensors="np"))
+
+        hidden_states = backend.run(inputs)
+        embeddings[batch] = pool(hidden_states, inputs["attention_mask"], pooling)
+
+    # Normalisation des vecteurs (important pour la similarité cosinus)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.maximum(norms, 1e-12)
+
+    return embeddings
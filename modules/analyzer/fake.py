@@ -0,0 +1,54 @@
+import time
+import zlib
+import numpy as np
+from .backends import BACKEND
+from .lexical import expand_terms, tokenize
+
+FAKE_DIM = 384
+# Durée simulée d'une passe du modèle, par lot
+FAKE_ENCODE_MS = 0.0
+
+
+def fake_embeddings(text_list, dim=FAKE_DIM):
+    """
+    Vecteurs déterministes sans modèle : les mots et n-grammes de caractères de chaque
+    texte (voir lexical.expand_terms) sont hachés dans dim composantes signées.
+    Deux textes qui partagent des mots restent proches, ce qui garde des résultats
+    plausibles pour les tests de charge.
+
+    Args:
+        text_list: Textes à encoder
+        dim: Dimension des vecteurs
+
+    Returns:
+        embeddings: Matrice (N, dim) de vecteurs normalisés (nuls pour les textes sans mot)
+    """
+    embeddings = np.zeros((len(text_list), dim), dtype=np.float32)
+    for i, text in enumerate(text_list):
+        for term, count in expand_terms(tokenize(text)).items():
+            h = zlib.crc32(term.encode("utf-8"))
+            embeddings[i, h % dim] += count if h & 0x80000000 else -count
+    embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    return embeddings
+
+
+def load_fake_encoder(model_name=None, backend=BACKEND, num_threads=None, dim=FAKE_DIM, delay_ms=FAKE_ENCODE_MS):
+    """
+    Remplace load_encoder / load_encoder2 par un encodeur factice, pour mesurer le
+    service (HTTP, analyse, scoring) sur n'importe quelle machine, sans les poids du
+    modèle ni torch.
+
+    Args:
+        model_name, backend, num_threads: Ignorés (même signature que load_encoder)
+        dim: Dimension des vecteurs
+        delay_ms: Attente ajoutée à chaque lot, pour simuler le coût du modèle
+
+    Returns:
+        encode, store: La fonction liste de textes -> matrice (N, D) et None (pas de stockage)
+    """
+    def encode(text_list):
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        return fake_embeddings(text_list, dim)
+
+    return encode, None
@@ -0,0 +1,179 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+import numpy as np
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+NGRAM_SIZE = 3
+# Poids des n-grammes de caractères (tolérance aux fautes de frappe) face aux mots entiers
+NGRAM_WEIGHT = 0.3
+PREFILTER_SIZE = 256
+
+# Élisions françaises : "l'accès" -> "accès", "qu'il" -> "il"
+ELISION_PATTERN = re.compile(r"\b(?:[cdjlmnst]|qu|jusqu|lorsqu|puisqu|quoiqu)['’]", re.IGNORECASE)
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Mots vides, sans accents (comparés après repliement)
+STOPWORDS = frozenset("""
+    a afin au aux avec ce ces cet cette chaque dans de des doit doivent donc dont du elle elles
+    en est et etre etc il ils la le les leur leurs lors mais meme ne ni nos notre nous on ou par
+    pas peut peuvent plus pour qu que qui sa sans se selon ses si son sont sur ta tous tout toute
+    toutes un une vos votre vous y
+""".split())
+
+
+def fold_text(text):
+    """Met un texte en minuscules, retire les élisions et les accents."""
+    text = ELISION_PATTERN.sub("", text.lower())
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """
+    Découpe un texte en mots normalisés (repliés, sans mots vides, pluriel simple retiré).
+
+    Args:
+        text: Texte à découper
+
+    Returns:
+        tokens: Liste des mots, dans l'ordre du texte
+    """
+    tokens = []
+    for word in WORD_PATTERN.findall(fold_text(text)):
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        if len(word) > 4 and word[-1] in "sx":
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def char_ngrams(word, n=NGRAM_SIZE):
+    """N-grammes de caractères d'un mot borné par "<" et ">" ("sauvegrade" -> "<sa", "sau", ...)."""
+    word = f"<{word}>"
+    return [word[i:i + n] for i in range(len(word) - n + 1)]
+
+
+def expand_terms(tokens):
+    """
+    Termes indexés pour une liste de mots : les mots eux-mêmes et, préfixés par "#",
+    les n-grammes de caractères des mots assez longs pour en avoir.
+
+    Returns:
+        terms: Compteur terme -> nombre d'occurrences
+    """
+    terms = Counter(tokens)
+    for token in tokens:
+        if len(token) >= NGRAM_SIZE + 1:
+            terms.update("#" + gram for gram in char_ngrams(token))
+    return terms
+
+
+def structure_terms(structure):
+    """
+    Mots de chaque énoncé d'une structure, dans l'ordre de ses sections et énoncés.
+
+    Args:
+        structure: Dictionnaire section -> liste d'énoncés ({"id", "text"})
+
+    Returns:
+        terms: Liste de listes de mots, un élément par énoncé
+    """
+    return [tokenize(f"{statement['id']} {statement['text']}")
+            for statements in structure.values() for statement in statements]
+
+
+class BM25Index:
+    """
+    Index inversé BM25 sur des énoncés (mots et n-grammes de caractères).
+
+    Pour chaque terme, la liste des lignes qui le contiennent est conservée avec le
+    poids BM25 déjà normalisé par la longueur de la ligne : une requête ne coûte que
+    la lecture des listes de ses termes.
+    """
+
+    def __init__(self, postings, size):
+        """
+        Args:
+            postings: Dictionnaire terme -> (lignes, poids) en tableaux NumPy
+            size: Nombre de lignes indexées
+        """
+        self.postings = postings
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    @classmethod
+    def build(cls, token_lists, k1=BM25_K1, b=BM25_B):
+        """
+        Construit l'index à partir des mots de chaque ligne.
+
+        Args:
+            token_lists: Liste de listes de mots (voir tokenize), une par ligne
+            k1: Saturation de la fréquence des termes
+            b: Importance de la normalisation par la longueur
+
+        Returns:
+            index: Instance de BM25Index
+        """
+        n = len(token_lists)
+        counts = [expand_terms(tokens) for tokens in token_lists]
+        lengths = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        avgdl = float(lengths.mean()) if n and lengths.mean() > 0 else 1.0
+
+        rows, tfs = {}, {}
+        for row, terms in enumerate(counts):
+            for term, tf in terms.items():
+                rows.setdefault(term, []).append(row)
+                tfs.setdefault(term, []).append(tf)
+
+        postings = {}
+        for term, term_rows in rows.items():
+            term_rows = np.array(term_rows, dtype=np.int64)
+            tf = np.array(tfs[term], dtype=np.float32)
+            idf = math.log(1 + (n - len(term_rows) + 0.5) / (len(term_rows) + 0.5))
+            weights = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[term_rows] / avgdl))
+            postings[term] = (term_rows, weights.astype(np.float32))
+        return cls(postings, n)
+
+    def scores(self, query):
+        """
+        Calcule les scores BM25 d'une question sur toutes les lignes.
+
+        Args:
+            query: Question (texte)
+
+        Returns:
+            scores: Vecteur (N,) de scores, nul pour les lignes sans terme commun
+        """
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term, count in expand_terms(tokenize(query)).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            weight = NGRAM_WEIGHT if term.startswith("#") else 1.0
+            term_rows, term_weights = posting
+            scores[term_rows] += weight * count * term_weights
+        return scores
+
+    def candidates(self, query, size=PREFILTER_SIZE):
+        """
+        Renvoie les lignes les mieux classées par BM25, en nombre borné.
+
+        Args:
+            query: Question (texte)
+            size: Nombre maximal de candidats
+
+        Returns:
+            indices, scores: Lignes retenues (score non nul) et leurs scores BM25
+        """
+        scores = self.scores(query)
+        n = min(size, int(np.count_nonzero(scores)))
+        if n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        indices = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.nonzero(scores)[0]
+        return indices, scores[indices]
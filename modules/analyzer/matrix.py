@@ -0,0 +1,187 @@
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from .scoring import top_k_indices
+
+MATRIX_DIR = ".cache/matrix"
+CHUNK_ROWS = 65536
+RESCORE_FACTOR = 4
+
+
+def quantize_int8(matrix):
+    """
+    Quantifie une matrice en int8 avec une échelle par ligne.
+
+    Returns:
+        quantized, scales: Matrice int8 (N, D) et échelles float32 (N,)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127 if len(matrix) else np.zeros(0, dtype=np.float32)
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales
+
+
+class CompactMatrix:
+    """
+    Matrice d'embeddings compacte stockée sur disque en float16, ou en int8 avec une
+    échelle par ligne, et ouverte par numpy.memmap : l'ouverture est immédiate et
+    seules les pages lues sont chargées en mémoire.
+
+    Le scoring se fait directement sur les données compactes, par blocs de lignes ;
+    une copie float32 facultative permet de recalculer exactement les meilleurs candidats.
+    """
+
+    def __init__(self, vectors, scales=None, exact=None):
+        """
+        Args:
+            vectors: Matrice (N, D) float16 ou int8 (éventuellement memmap)
+            scales: Échelles par ligne pour int8
+            exact: Matrice float32 (N, D) pour le rescoring (facultatif)
+        """
+        self.vectors = vectors
+        self.scales = scales
+        self.exact = exact
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @staticmethod
+    def write(path, matrix, dtype="float16", keep_exact=False):
+        """
+        Écrit une matrice au format compact.
+
+        Args:
+            path: Dossier de destination
+            matrix: Matrice float32 (N, D) de vecteurs normalisés
+            dtype: "float16" ou "int8"
+            keep_exact: Conserver aussi une copie float32 pour le rescoring (elle annule
+                le gain de place : à réserver aux cas où l'ordre exact compte)
+        """
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unknown storage type: {dtype}")
+        matrix = np.asarray(matrix, dtype=np.float32)
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+
+        # Écriture dans un dossier temporaire renommé ensuite : un autre processus ne
+        # voit jamais de matrice partielle
+        tmp_path = tempfile.mkdtemp(dir=parent, prefix="." + os.path.basename(path) + ".")
+        try:
+            if dtype == "float16":
+                np.save(os.path.join(tmp_path, "vectors.npy"), matrix.astype(np.float16))
+            else:
+                quantized, scales = quantize_int8(matrix)
+                np.save(os.path.join(tmp_path, "vectors.npy"), quantized)
+                np.save(os.path.join(tmp_path, "scales.npy"), scales)
+
+            if keep_exact:
+                np.save(os.path.join(tmp_path, "exact.npy"), matrix)
+
+            # Écrit en dernier : sa présence signale une matrice complète
+            with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"dtype": dtype, "rows": len(matrix), "dim": matrix.shape[1] if matrix.ndim == 2 else 0}, f)
+
+            try:
+                os.replace(tmp_path, path)
+            except OSError:
+                # Matrice déjà écrite entre-temps par un autre processus : on garde la sienne
+                if not CompactMatrix.exists(path):
+                    raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @classmethod
+    def open(cls, path):
+        """Ouvre une matrice compacte en memmap (temps constant quelle que soit sa taille)."""
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        scales = None
+        if meta["dtype"] == "int8":
+            scales = np.load(os.path.join(path, "scales.npy"), mmap_mode="r")
+
+        exact_path = os.path.join(path, "exact.npy")
+        exact = np.load(exact_path, mmap_mode="r") if os.path.exists(exact_path) else None
+        return cls(vectors, scales, exact)
+
+    @staticmethod
+    def remove(path):
+        """
+        Supprime une matrice. Elle est d'abord renommée, donc disparaît d'un coup pour
+        les autres processus ; ceux qui l'ont déjà ouverte en memmap gardent leurs pages.
+        """
+        trash = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.removed")
+        try:
+            os.replace(path, trash)
+        except OSError:
+            return
+        shutil.rmtree(trash, ignore_errors=True)
+
+    @staticmethod
+    def exists(path):
+        """Indique si une matrice complète est présente dans path."""
+        return os.path.exists(os.path.join(path, "meta.json"))
+
+    def scores(self, queries):
+        """
+        Calcule les similarités (approchées) avec toutes les lignes, bloc par bloc.
+
+        Args:
+            queries: Vecteur (D,) ou matrice (Q, D) de requêtes normalisées
+
+        Returns:
+            scores: Vecteur (N,) ou matrice (Q, N) float32
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        scores = np.empty(queries.shape[:-1] + (len(self),), dtype=np.float32)
+
+        for start in range(0, len(self), CHUNK_ROWS):
+            end = min(start + CHUNK_ROWS, len(self))
+            chunk = np.asarray(self.vectors[start:end], dtype=np.float32)
+            block = queries @ chunk.T
+            if self.scales is not None:
+                block *= self.scales[start:end]
+            scores[..., start:end] = block
+        return scores
+
+    def take(self, indices):
+        """
+        Renvoie les vecteurs float32 de quelques lignes, depuis la copie exacte
+        (ou en décompressant les données compactes si elle est absente).
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if self.exact is not None:
+            return np.asarray(self.exact[indices], dtype=np.float32)
+
+        rows = np.asarray(self.vectors[indices], dtype=np.float32)
+        if self.scales is not None:
+            rows *= self.scales[indices][:, None]
+        return rows
+
+    def rescore(self, query, indices):
+        """Recalcule les scores de quelques lignes à partir des vecteurs de take."""
+        return self.take(indices) @ np.asarray(query, dtype=np.float32)
+
+    def top_k(self, query, top_k=2, min_score=None, rescore=True):
+        """
+        Renvoie les lignes les plus similaires à une requête.
+
+        Les candidats sont présélectionnés sur les scores approchés, puis, si rescore
+        est demandé, reclassés sur les scores float32.
+
+        Returns:
+            indices, similarities: Indices des lignes retenues et leurs scores
+        """
+        scores = self.scores(query)
+        if not rescore:
+            indices = top_k_indices(scores, top_k, min_score)
+            return indices, scores[indices].tolist()
+
+        candidates = top_k_indices(scores, top_k * RESCORE_FACTOR)
+        exact = self.rescore(query, candidates)
+        order = top_k_indices(exact, top_k, min_score)
+        return candidates[order], exact[order].tolist()
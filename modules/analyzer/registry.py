@@ -0,0 +1,79 @@
+import threading
+
+
+class ModelRegistry:
+    """
+    Registre des modèles d'embeddings partagé par tout le processus.
+    Chaque modèle n'est chargé qu'une seule fois, même si plusieurs threads
+    le demandent en même temps.
+    """
+
+    def __init__(self):
+        """Initialise un registre vide."""
+        self._models = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _lock_for(self, model_name):
+        """Renvoie le verrou propre à un modèle (un chargement n'en bloque pas un autre)."""
+        with self._lock:
+            if model_name not in self._locks:
+                self._locks[model_name] = threading.Lock()
+            return self._locks[model_name]
+
+    def get(self, model_name):
+        """
+        Renvoie le tokenizer et le modèle associés à model_name, en les chargeant
+        au premier appel.
+
+        Args:
+            model_name: Nom du modèle à utiliser
+
+        Returns:
+            tokenizer, model: Les instances partagées
+        """
+        entry = self._models.get(model_name)
+        if entry is not None:
+            return entry
+
+        with self._lock_for(model_name):
+            # Un autre thread a pu terminer le chargement pendant l'attente
+            entry = self._models.get(model_name)
+            if entry is None:
+                # Import différé : transformers (et torch) ne sont chargés qu'au premier modèle
+                from transformers import AutoTokenizer, AutoModel
+
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                model = AutoModel.from_pretrained(model_name)
+                model.eval()
+                entry = (tokenizer, model)
+                self._models[model_name] = entry
+        return entry
+
+    def is_loaded(self, model_name):
+        """Indique si le modèle est déjà en mémoire."""
+        return model_name in self._models
+
+    def unload(self, model_name):
+        """Retire un modèle du registre (il sera rechargé au prochain appel)."""
+        with self._lock_for(model_name):
+            self._models.pop(model_name, None)
+
+
+registry = ModelRegistry()
+
+
+def get_model(model_name):
+    """Raccourci vers le registre global : renvoie (tokenizer, model)."""
+    return registry.get(model_name)
+
+
+def preload_models(model_names):
+    """
+    Charge à l'avance une liste de modèles, typiquement au démarrage de l'application.
+
+    Args:
+        model_names: Noms des modèles à charger
+    """
+    for model_name in model_names:
+        registry.get(model_name)
@@ -0,0 +1,105 @@
+import numpy as np
+
+
+def top_k_indices(scores, top_k, min_score=None):
+    """
+    Sélectionne les indices des meilleurs scores sans trier tout le tableau.
+
+    Args:
+        scores: Vecteur de scores
+        top_k: Nombre de résultats à garder
+        min_score: Score minimal pour garder un résultat (facultatif)
+
+    Returns:
+        indices: Indices des meilleurs scores, par score décroissant
+    """
+    n = len(scores)
+    if n == 0 or top_k <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if top_k < n:
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(n)
+
+    # Tri des seuls candidats retenus
+    indices = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    if min_score is not None:
+        indices = indices[scores[indices] >= min_score]
+    return indices
+
+
+class Scorer:
+    """
+    Moteur de similarité sur une matrice d'embeddings déjà normalisés.
+    La similarité cosinus se réduit alors à un produit scalaire.
+    """
+
+    def __init__(self, embeddings):
+        """
+        Args:
+            embeddings: Matrice (N, D) de vecteurs normalisés
+        """
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def scores(self, queries):
+        """
+        Calcule les similarités entre une ou plusieurs requêtes et toutes les lignes.
+
+        Args:
+            queries: Vecteur (D,) ou matrice (Q, D) de requêtes normalisées
+
+        Returns:
+            scores: Vecteur (N,) ou matrice (Q, N) de similarités
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        if len(self.embeddings) == 0:
+            return np.zeros(queries.shape[:-1] + (0,), dtype=np.float32)
+        return queries @ self.embeddings.T
+
+    def take(self, indices):
+        """Renvoie les vecteurs de quelques lignes."""
+        return self.embeddings[indices]
+
+    def rescore(self, query, indices):
+        """Renvoie les scores exacts de quelques lignes."""
+        return self.take(indices) @ np.asarray(query, dtype=np.float32)
+
+    def top_k(self, query, top_k=2, min_score=None):
+        """
+        Renvoie les lignes les plus similaires à une requête.
+
+        Args:
+            query: Vecteur (D,) normalisé
+            top_k: Nombre de résultats à retourner
+            min_score: Score minimal pour garder un résultat (facultatif)
+
+        Returns:
+            indices, similarities: Indices des lignes retenues et leurs scores
+        """
+        scores = self.scores(query)
+        indices = top_k_indices(scores, top_k, min_score)
+        return indices, scores[indices].tolist()
+
+    def top_k_batch(self, queries, top_k=2, min_score=None):
+        """
+        Version matricielle de top_k pour plusieurs requêtes à la fois.
+
+        Args:
+            queries: Matrice (Q, D) de requêtes normalisées
+            top_k: Nombre de résultats par requête
+            min_score: Score minimal pour garder un résultat (facultatif)
+
+        Returns:
+            results: Liste de (indices, similarities), une entrée par requête
+        """
+        scores = self.scores(queries)
+        results = []
+        for row in scores:
+            indices = top_k_indices(row, top_k, min_score)
+            results.append((indices, row[indices].tolist()))
+        return results
@@ -0,0 +1,120 @@
+from bisect import bisect_right
+import numpy as np
+from .scoring import Scorer, top_k_indices
+
+TOP_SECTIONS = 4
+
+
+def statement_sections(sections, statements):
+    """
+    Indice de la section de chaque énoncé d'un document.
+
+    Les énoncés sont rattachés à la dernière section qui les précède (par numéro de
+    ligne), ou à défaut à la première section portant le titre sous lequel ils sont rangés.
+
+    Args:
+        sections: Sections du document, dans l'ordre ({"id", "title", "level", "line"})
+        statements: Liste de (titre de section, énoncé)
+
+    Returns:
+        indices: Indice de section par énoncé (-1 avant la première section)
+    """
+    lines = [section["line"] for section in sections]
+    by_title = {}
+    for i, section in enumerate(sections):
+        by_title.setdefault(section["title"], i)
+
+    indices = []
+    for title, statement in statements:
+        if "line" in statement:
+            indices.append(bisect_right(lines, statement["line"]) - 1)
+        else:
+            indices.append(by_title.get(title, -1))
+    return indices
+
+
+def section_groups(sections, indices):
+    """
+    Regroupe les énoncés d'un document par sous-arbre de sections : une section
+    contient ses propres énoncés et ceux des sous-sections qui la suivent.
+
+    Args:
+        sections: Sections du document, dans l'ordre ({"id", "title", "level", "line"})
+        indices: Indice de section de chaque énoncé (voir statement_sections)
+
+    Returns:
+        groups: Liste de (section, positions des énoncés) ; les énoncés placés avant
+            la première section forment un groupe sans section (None)
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    groups = []
+    if (indices < 0).any():
+        groups.append((None, np.nonzero(indices < 0)[0]))
+
+    for i, section in enumerate(sections):
+        end = i + 1
+        while end < len(sections) and sections[end]["level"] > section["level"]:
+            end += 1
+        members = np.nonzero((indices >= i) & (indices < end))[0]
+        if len(members):
+            groups.append((section, members))
+    return groups
+
+
+class SectionIndex:
+    """
+    Vecteurs des sections du corpus pour une recherche hiérarchique.
+
+    Chaque section est représentée par le centroïde normalisé des énoncés de son
+    sous-arbre, calculé à partir des vecteurs déjà présents dans l'index : la
+    question est d'abord comparée aux sections, puis seulement aux énoncés des
+    sections retenues.
+    """
+
+    def __init__(self, groups, vectors):
+        """
+        Args:
+            groups: Liste de (document, section, lignes de l'index)
+            vectors: Matrice (S, D) des vecteurs de sections normalisés
+        """
+        self.groups = groups
+        self.scorer = Scorer(vectors)
+
+    def __len__(self):
+        return len(self.groups)
+
+    @classmethod
+    def build(cls, doc_groups, take):
+        """
+        Calcule les vecteurs des sections.
+
+        Args:
+            doc_groups: Liste de (document, section, lignes de l'index)
+            take: Fonction indices de lignes -> vecteurs (N, D) des énoncés
+
+        Returns:
+            index: Instance de SectionIndex
+        """
+        vectors = [np.asarray(take(rows), dtype=np.float32).mean(axis=0) for _, _, rows in doc_groups]
+        if not vectors:
+            return cls([], np.zeros((0, 0), dtype=np.float32))
+
+        vectors = np.stack(vectors)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return cls(doc_groups, vectors)
+
+    def candidates(self, query, top_sections=TOP_SECTIONS):
+        """
+        Sélectionne les sections les plus proches d'une question.
+
+        Args:
+            query: Vecteur (D,) normalisé
+            top_sections: Nombre de sections retenues
+
+        Returns:
+            rows: Lignes de l'index appartenant aux sections retenues (triées, sans doublon)
+        """
+        selected = top_k_indices(self.scorer.scores(query), top_sections)
+        if not len(selected):
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate([self.groups[i][2] for i in selected]))
@@ -0,0 +1,213 @@
+import hashlib
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from .scoring import Scorer
+from .statements import StatementIndex, statement_text
+from ..metrics import stage
+
+# En dessous de ce nombre d'énoncés, le scoring reste dans le thread appelant
+PARALLEL_MIN_ROWS = 50000
+
+
+class Shard:
+    """Partition de l'index : les énoncés d'un document et leur matrice d'embeddings."""
+
+    def __init__(self, name, rows, scorer, key):
+        """
+        Args:
+            name: Nom du document
+            rows: Lignes de la partition ({"doc", "section", "id", "text"})
+            scorer: Scorer sur les vecteurs de ces lignes
+            key: Empreinte des textes, pour savoir si la partition doit être refaite
+        """
+        self.name = name
+        self.rows = rows
+        self.scorer = scorer
+        self.key = key
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def shard_key(texts):
+    """Empreinte d'une liste de textes."""
+    return hashlib.sha1("\n".join(texts).encode("utf-8")).hexdigest()
+
+
+def balance(shards, n):
+    """
+    Répartit les partitions en n groupes de tailles proches (les plus grandes d'abord,
+    chacune dans le groupe le moins chargé).
+    """
+    loads = [(0, i) for i in range(n)]
+    groups = [[] for _ in range(n)]
+    for shard in sorted(shards, key=len, reverse=True):
+        load, i = heapq.heappop(loads)
+        groups[i].append(shard)
+        heapq.heappush(loads, (load + len(shard), i))
+    return [group for group in groups if group]
+
+
+class ShardedStatementIndex(StatementIndex):
+    """
+    Index des énoncés partitionné par document.
+
+    Chaque document a sa propre matrice : un document ajouté, modifié ou supprimé
+    ne touche que sa partition. Les partitions sont scorées en parallèle sur un
+    pool de threads (NumPy libère le GIL pendant les produits matriciels), puis
+    les meilleurs résultats de chacune sont fusionnés avec un tas.
+
+    Chaque partition est une matrice float32 scorée en entier : la matrice compacte,
+    le préfiltre et la fusion BM25, la recherche hiérarchique et la déduplication
+    (compact, prefilter, fusion, top_sections, dedup de StatementIndex) ne sont pas
+    disponibles.
+    """
+
+    def __init__(self, encode, store=None, batcher=None, cache=None, workers=None):
+        """
+        Args:
+            encode: Fonction liste de textes -> matrice (N, D) de vecteurs normalisés
+            store: Stockage d'embeddings déjà calculés (facultatif)
+            batcher: MicroBatcher utilisé pour encoder les questions (facultatif)
+            cache: QueryCache propre à cet index, donc à un mode (facultatif)
+            workers: Nombre de threads de scoring (par défaut le nombre de cœurs)
+        """
+        super().__init__(encode, store, batcher, cache)
+        self.workers = workers or os.cpu_count() or 1
+        self.shards = {}
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def build(self, documents, version=None, terms=None, sections=None):
+        """
+        Met à jour les partitions à partir des structures des documents : seules
+        celles des documents ajoutés ou modifiés sont recalculées.
+
+        Args:
+            documents: Dictionnaire nom du document -> structure (section -> énoncés)
+            version: Version du corpus correspondant (facultatif)
+            terms, sections: Ignorés (pas de préfiltre ni de recherche hiérarchique par partition)
+        """
+        for name in [name for name in self.shards if name not in documents]:
+            self.remove_shard(name)
+        for name in sorted(documents):
+            self.add_shard(name, documents[name])
+
+        with self._lock:
+            self.rows = [row for name in sorted(self.shards) for row in self.shards[name].rows]
+            self.vectors = len(self.rows)
+            self.version = version
+
+        if self.cache is not None:
+            self.cache.check_version(version)
+
+    def add_shard(self, name, structure):
+        """
+        Ajoute ou remplace la partition d'un document (inchangée si ses énoncés le sont).
+
+        Args:
+            name: Nom du document
+            structure: Dictionnaire section -> énoncés
+        """
+        rows = [{"doc": name, "section": section, "id": statement["id"], "text": statement_text(statement)}
+                for section, statements in structure.items() for statement in statements]
+        texts = [row["text"] for row in rows]
+        key = shard_key(texts)
+
+        shard = self.shards.get(name)
+        if shard is not None and shard.key == key:
+            return
+        if not rows:
+            self.remove_shard(name)
+            return
+
+        with stage("indexing", len(texts)):
+            shard = Shard(name, rows, Scorer(self._embeddings(texts)), key)
+        with self._lock:
+            self.shards[name] = shard
+
+    def remove_shard(self, name):
+        """Retire la partition d'un document."""
+        with self._lock:
+            self.shards.pop(name, None)
+
+    def _executor(self):
+        """
+        Pool de threads de scoring, créé à la première recherche parallèle (une seule
+        fois, même si plusieurs recherches arrivent ensemble) et recréé après un fork
+        (les threads ne le survivent pas).
+        """
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="shard")
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _score_shards(self, vector, shards, top_k, min_score):
+        """
+        Meilleurs énoncés de chaque partition, en parallèle si l'index est assez grand.
+
+        Returns:
+            results: Liste de (partition, indices, scores), scores décroissants
+        """
+        def run(group):
+            return [(shard, *shard.scorer.top_k(vector, top_k, min_score)) for shard in group]
+
+        if self.workers <= 1 or sum(len(shard) for shard in shards) < PARALLEL_MIN_ROWS:
+            return run(shards)
+        groups = balance(shards, self.workers)
+        return [result for results in self._executor().map(run, groups) for result in results]
+
+    def _search_iter(self, query, top_k, top_docs, min_score, vector=None):
+        """Générateur de résultats par document, sans passer par le cache des résultats."""
+        if vector is None:
+            with stage("encoding", 1):
+                vector = self.encode_query(query) if isinstance(query, str) else query
+
+        with self._lock:
+            shards = list(self.shards.values())
+        with stage("scoring", sum(len(shard) for shard in shards)):
+            results = self._score_shards(vector, shards, top_k, min_score)
+
+        # Une partition par document : ses meilleurs énoncés sont ceux du document
+        with stage("routing", len(results)):
+            best = heapq.nlargest(top_docs, (result for result in results if len(result[1])),
+                                  key=lambda result: result[2][0])
+
+        for shard, indices, scores in best:
+            yield shard.name, [dict(shard.rows[i], score=score) for i, score in zip(indices, scores)]
+
+    def top_statements(self, query, top_k=10, min_score=None):
+        """
+        Meilleurs énoncés de tout le corpus, quel que soit leur document.
+
+        Args:
+            query: Question (texte) ou vecteur déjà encodé
+            top_k: Nombre d'énoncés à retourner
+            min_score: Score minimal pour garder un énoncé (facultatif)
+
+        Returns:
+            matches: Liste de lignes (avec leur score), par score décroissant
+        """
+        vector = self.encode_query(query) if isinstance(query, str) else query
+        with self._lock:
+            shards = list(self.shards.values())
+        results = self._score_shards(vector, shards, top_k, min_score)
+
+        # Fusion des listes triées de chaque partition
+        by_name = {shard.name: shard for shard, _, _ in results}
+        merged = heapq.merge(*[[(-score, shard.name, i) for i, score in zip(indices, scores)]
+                               for shard, indices, scores in results])
+        return [dict(by_name[name].rows[i], score=-score) for score, name, i in islice(merged, top_k)]
+
+    def search_batch(self, queries, top_k=2, top_docs=2, min_score=None):
+        """Recherche d'une liste de questions, encodées par lots (voir StatementIndex.search_batch)."""
+        queries = list(queries)
+        with stage("encoding", len(queries)):
+            vectors = self.encode(queries) if queries else []
+        return [dict(self._search_iter(query, top_k, top_docs, min_score, vector))
+                for query, vector in zip(queries, vectors)]
@@ -0,0 +1,466 @@
+import hashlib
+import os
+import threading
+import numpy as np
+from .scoring import Scorer, top_k_indices
+from .matrix import CompactMatrix, MATRIX_DIR, RESCORE_FACTOR
+from .lexical import BM25Index, tokenize
+from .sections import SectionIndex, section_groups, statement_sections
+from .dedup import GroupedScorer, near_duplicate_groups
+from ..metrics import stage
+
+# Taille maximale (en nombre de scores) d'un bloc questions x énoncés en recherche par lots
+BATCH_SCORES = 1 << 25
+
+
+def statement_text(statement):
+    """Texte encodé et affiché pour un énoncé : son identifiant suivi de son contenu."""
+    return f"{statement['id']} {statement['text']}"
+
+
+class StatementIndex:
+    """
+    Index global des énoncés de tous les documents du corpus.
+
+    Chaque ligne de la matrice d'embeddings correspond à un énoncé et conserve
+    son document, sa section et son identifiant. Une question se résout avec un
+    seul encodage et un seul passage de scoring sur tout l'index.
+    """
+
+    def __init__(self, encode, store=None, batcher=None, cache=None, compact=None, compact_dir=MATRIX_DIR,
+                 prefilter=None, fusion=None, top_sections=None, dedup=None, compact_exact=False, name="index"):
+        """
+        Args:
+            encode: Fonction liste de textes -> matrice (N, D) de vecteurs normalisés
+            store: Stockage d'embeddings déjà calculés (facultatif)
+            batcher: MicroBatcher utilisé pour encoder les questions (facultatif)
+            cache: QueryCache propre à cet index, donc à un mode (facultatif)
+            compact: Stockage compact en memmap de la matrice ("float16", "int8" ou None)
+            compact_dir: Dossier des matrices compactes
+            prefilter: Nombre maximal de candidats présélectionnés par BM25 avant le
+                scoring dense (None : tous les énoncés sont scorés). Sans matrice compacte,
+                seuls les candidats sont encodés, à la demande.
+            fusion: Poids du score BM25 normalisé dans le score final (None : score dense seul)
+            top_sections: Recherche hiérarchique : nombre de sections retenues avant de
+                scorer leurs énoncés (None : tous les énoncés sont scorés)
+            dedup: Seuil de similarité (MinHash) au-delà duquel des énoncés quasi identiques
+                partagent un seul vecteur (None : un vecteur par énoncé). Incompatible avec
+                prefilter sans compact, où les vecteurs sont encodés énoncé par énoncé
+            compact_exact: Garder aussi une copie float32 de la matrice compacte pour
+                reclasser les meilleurs candidats sur leurs scores exacts
+            name: Nom de l'index (ex. le mode), qui distingue ses matrices compactes
+                de celles des autres index quand il n'a pas de stockage
+
+        Raises:
+            ValueError: Si dedup est demandé avec prefilter mais sans compact
+        """
+        if dedup and prefilter and not compact:
+            raise ValueError("dedup requires compact when prefilter is set")
+        self.encode = encode
+        self.store = store
+        self.batcher = batcher
+        self.cache = cache
+        self.compact = compact
+        self.compact_dir = compact_dir
+        self.compact_exact = compact_exact
+        self.name = name
+        self.prefilter = prefilter
+        self.fusion = fusion
+        self.top_sections = top_sections
+        self.dedup = dedup
+        self.rows = []
+        self.vectors = 0
+        self.doc_ranges = {}
+        self.scorer = Scorer(np.zeros((0, 0), dtype=np.float32))
+        self.lexical = None
+        self.section_index = None
+        self.version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def build(self, documents, version=None, terms=None, sections=None):
+        """
+        Construit l'index à partir des structures des documents.
+
+        Args:
+            documents: Dictionnaire nom du document -> structure (section -> énoncés)
+            version: Version du corpus correspondant (facultatif)
+            terms: Mots de chaque énoncé calculés à l'indexation du corpus
+                (nom du document -> listes de mots, voir lexical.structure_terms)
+            sections: Sections détectées dans chaque document, pour la recherche
+                hiérarchique (nom du document -> liste de sections)
+        """
+        rows = []
+        doc_ranges = {}
+        tokens = []
+        groups = []
+        contents = []
+        for doc in sorted(documents):
+            start = len(rows)
+            doc_statements = []
+            for section, statements in documents[doc].items():
+                for statement in statements:
+                    doc_statements.append((section, statement))
+                    contents.append(statement["text"])
+                    rows.append({
+                        "doc": doc,
+                        "section": section,
+                        "id": statement["id"],
+                        "text": statement_text(statement),
+                    })
+            if len(rows) > start:
+                doc_ranges[doc] = (start, len(rows))
+
+            doc_terms = (terms or {}).get(doc)
+            if doc_terms is None or len(doc_terms) != len(rows) - start:
+                doc_terms = [tokenize(row["text"]) for row in rows[start:]]
+            tokens.extend(doc_terms)
+
+            if self.top_sections:
+                doc_sections = (sections or {}).get(doc, [])
+                indices = statement_sections(doc_sections, doc_statements)
+                groups += [(doc, section, members + start)
+                           for section, members in section_groups(doc_sections, indices)]
+
+        texts = [row["text"] for row in rows]
+        lexical = None
+        if self.prefilter or self.fusion:
+            with stage("lexical_indexing", len(texts)):
+                lexical = BM25Index.build(tokens)
+
+        duplicates = None
+        if self.dedup:
+            with stage("deduplication", len(texts)):
+                duplicates = self._deduplicate(rows, contents)
+
+        # Un seul vecteur par groupe de quasi-doublons : celui de son premier énoncé
+        vector_texts = texts if duplicates is None else [texts[i] for i in duplicates[1]]
+        with stage("indexing", len(vector_texts)):
+            if self.compact:
+                scorer = self._load_matrix(vector_texts)
+            elif self.prefilter:
+                # Les énoncés ne sont encodés qu'une fois présélectionnés par une question
+                scorer = None
+            else:
+                scorer = Scorer(self._embeddings(vector_texts))
+            if duplicates is not None:
+                scorer = GroupedScorer(scorer, duplicates[0])
+
+        section_index = None
+        if self.top_sections and scorer is not None:
+            with stage("section_indexing", len(groups)):
+                section_index = SectionIndex.build(groups, scorer.take)
+
+        with self._lock:
+            self.rows = rows
+            self.doc_ranges = doc_ranges
+            self.scorer = scorer
+            self.lexical = lexical
+            self.section_index = section_index
+            self.vectors = len(vector_texts)
+            self.version = version
+
+        if self.cache is not None:
+            self.cache.check_version(version)
+
+    def _deduplicate(self, rows, contents):
+        """
+        Regroupe les énoncés quasi identiques et ajoute à chaque ligne d'un groupe la
+        liste des autres énoncés du groupe ("duplicates" : documents et identifiants).
+
+        Returns:
+            groups, canonical: Indice du groupe de chaque ligne et première ligne de
+                chaque groupe, ou None si aucun énoncé n'a de quasi-doublon
+        """
+        groups = near_duplicate_groups(contents, self.dedup)
+        canonical = np.unique(groups, return_index=True)[1]
+        if len(canonical) == len(rows):
+            return None
+
+        members = {}
+        for i, group in enumerate(groups):
+            members.setdefault(group, []).append(i)
+        for group_rows in members.values():
+            if len(group_rows) > 1:
+                for i in group_rows:
+                    rows[i]["duplicates"] = [{"doc": rows[j]["doc"], "id": rows[j]["id"]}
+                                             for j in group_rows if j != i]
+        return groups, canonical
+
+    @property
+    def _rescore(self):
+        """Les scores de la matrice sont approchés et une copie exacte permet de les corriger."""
+        return bool(self.compact and self.compact_exact)
+
+    def _embeddings(self, texts, deferred=False):
+        """
+        Embeddings des énoncés, en n'encodant que ceux absents du stockage.
+
+        Args:
+            texts: Textes des énoncés
+            deferred: Appel depuis une requête : les nouveaux vecteurs sont écrits plus
+                tard, par lots, plutôt que de réécrire le stockage à chaque question
+        """
+        if self.store is None:
+            return self.encode(texts)
+        if deferred:
+            return self.store.get_or_encode_deferred(texts, self.encode)
+        return self.store.get_or_encode(texts, self.encode)
+
+    def _load_matrix(self, texts):
+        """
+        Ouvre la matrice compacte correspondant exactement à ces énoncés, en l'écrivant
+        d'abord si elle n'existe pas encore. Au redémarrage, l'ouverture est immédiate
+        et ne relit ni le stockage ni le modèle.
+        """
+        name = self.store.name if self.store is not None else self.name
+        prefix = f"{name}-{self.compact}{'+exact' if self.compact_exact else ''}-"
+        digest = hashlib.sha1("\n".join(texts).encode("utf-8")).hexdigest()[:16]
+        path = os.path.join(self.compact_dir, prefix + digest)
+
+        if not CompactMatrix.exists(path):
+            CompactMatrix.write(path, self._embeddings(texts), self.compact, self.compact_exact)
+
+            # Suppression des matrices des versions précédentes du corpus
+            for other in os.listdir(self.compact_dir):
+                if other.startswith(prefix) and other != prefix + digest:
+                    CompactMatrix.remove(os.path.join(self.compact_dir, other))
+
+        return CompactMatrix.open(path)
+
+    def encode_query(self, query):
+        """Encode une question en un vecteur normalisé."""
+        if self.cache is not None:
+            return self.cache.embedding(query, self._encode_query)
+        return self._encode_query(query)
+
+    def _encode_query(self, query):
+        """Encode une question sans passer par le cache."""
+        if self.batcher is not None:
+            # Regroupée avec les questions concurrentes en une seule passe du modèle
+            return self.batcher.encode(query)
+        return self.encode([query])[0]
+
+    def search(self, query, top_k=2, top_docs=2, min_score=None):
+        """
+        Recherche les énoncés les plus proches d'une question, regroupés par document.
+
+        Les documents sont classés selon le score de leur meilleur énoncé ; seuls les
+        top_docs premiers sont gardés, avec leurs top_k meilleurs énoncés.
+
+        Args:
+            query: Question (texte) ou vecteur déjà encodé
+            top_k: Nombre d'énoncés à retourner par document
+            top_docs: Nombre de documents à retourner
+            min_score: Score minimal pour garder un énoncé (facultatif)
+
+        Returns:
+            results: Dictionnaire ordonné document -> liste de lignes (avec leur score)
+        """
+        if self.cache is not None and isinstance(query, str):
+            params = (top_k, top_docs, min_score)
+            return self.cache.result(query, self.version, params, lambda: self._search(query, top_k, top_docs, min_score))
+        return self._search(query, top_k, top_docs, min_score)
+
+    def search_iter(self, query, top_k=2, top_docs=2, min_score=None):
+        """
+        Variante de search qui renvoie les documents un par un, dans l'ordre de
+        pertinence, dès que leurs meilleurs énoncés sont sélectionnés.
+
+        Args:
+            query: Question (texte) ou vecteur déjà encodé
+            top_k: Nombre d'énoncés à retourner par document
+            top_docs: Nombre de documents à retourner
+            min_score: Score minimal pour garder un énoncé (facultatif)
+
+        Yields:
+            doc, matches: Nom du document et liste de ses lignes (avec leur score)
+        """
+        cacheable = self.cache is not None and isinstance(query, str)
+        params = (top_k, top_docs, min_score)
+        version = self.version
+        if cacheable:
+            cached = self.cache.get_result(query, version, params)
+            if cached is not None:
+                yield from cached.items()
+                return
+
+        results = {}
+        for doc, matches in self._search_iter(query, top_k, top_docs, min_score):
+            results[doc] = matches
+            yield doc, matches
+
+        # Seuls les résultats complets sont mis en cache
+        if cacheable:
+            self.cache.put_result(query, version, params, results)
+
+    def search_batch(self, queries, top_k=2, top_docs=2, min_score=None):
+        """
+        Recherche d'une liste de questions : encodage par lots, puis un produit
+        matrice-matrice par bloc de questions sur tout l'index.
+
+        Args:
+            queries: Liste de questions (textes)
+            top_k: Nombre d'énoncés à retourner par document
+            top_docs: Nombre de documents à retourner par question
+            min_score: Score minimal pour garder un énoncé (facultatif)
+
+        Returns:
+            results: Liste de résultats (comme search), un par question
+        """
+        queries = list(queries)
+        with stage("encoding", len(queries)):
+            vectors = self.encode(queries) if queries else []
+
+        with self._lock:
+            rows, doc_ranges, scorer = self.rows, self.doc_ranges, self.scorer
+            lexical, section_index = self.lexical, self.section_index
+        if lexical is not None or section_index is not None:
+            # Préfiltre, fusion et choix des sections dépendent de chaque question
+            return [dict(self._search_iter(query, top_k, top_docs, min_score, vector))
+                    for query, vector in zip(queries, vectors)]
+
+        results = []
+        block = max(1, BATCH_SCORES // max(1, len(rows)))
+        for start in range(0, len(queries), block):
+            with stage("scoring", len(rows) * len(vectors[start:start + block])):
+                scores = scorer.scores(vectors[start:start + block])
+            for vector, query_scores in zip(vectors[start:start + block], scores):
+                results.append(dict(self._rank(vector, query_scores, rows, doc_ranges, scorer,
+                                               top_k, top_docs, min_score, self._rescore)))
+        return results
+
+    def _search(self, query, top_k, top_docs, min_score):
+        """Recherche sans passer par le cache des résultats."""
+        return dict(self._search_iter(query, top_k, top_docs, min_score))
+
+    def _search_iter(self, query, top_k, top_docs, min_score, vector=None):
+        """Générateur de résultats par document, sans passer par le cache des résultats."""
+        if vector is None:
+            with stage("encoding", 1):
+                vector = self.encode_query(query) if isinstance(query, str) else query
+
+        with self._lock:
+            rows, doc_ranges, scorer = self.rows, self.doc_ranges, self.scorer
+            lexical, section_index = self.lexical, self.section_index
+        if lexical is not None and isinstance(query, str):
+            scores, rescore = self._hybrid_scores(query, vector, rows, scorer, lexical), False
+        elif section_index is not None:
+            scores, rescore = self._section_scores(vector, rows, scorer, section_index), False
+        else:
+            if scorer is None:
+                raise ValueError("The lexical prefilter needs the question text")
+            with stage("scoring", len(rows)):
+                scores, rescore = scorer.scores(vector), self._rescore
+
+        yield from self._rank(vector, scores, rows, doc_ranges, scorer, top_k, top_docs, min_score, rescore)
+
+    def _rank(self, vector, scores, rows, doc_ranges, scorer, top_k, top_docs, min_score, rescore):
+        """
+        Classe les documents selon leur meilleur énoncé et renvoie leurs meilleurs énoncés.
+
+        Yields:
+            doc, matches: Nom du document et liste de ses lignes (avec leur score)
+        """
+        with stage("routing", len(doc_ranges)):
+            if rescore:
+                # Scores approchés : les documents sont classés sur les scores exacts
+                # de leurs meilleurs candidats, qu'il faut donc tous sélectionner
+                ranking = [(doc, self._select(vector, scores, scorer, start, end, top_k, min_score, rescore))
+                           for doc, (start, end) in doc_ranges.items()]
+                ranking = [(doc, selected) for doc, selected in ranking if len(selected[0])]
+                ranking.sort(key=lambda x: x[1][1][0], reverse=True)
+            else:
+                # Le meilleur énoncé de chaque document suffit à les classer ; la
+                # sélection de leurs énoncés est faite au fur et à mesure
+                ranking = sorted(((doc, None) for doc in doc_ranges),
+                                 key=lambda x: scores[slice(*doc_ranges[x[0]])].max(), reverse=True)
+
+        returned = 0
+        for doc, selected in ranking:
+            if returned >= top_docs:
+                break
+            if selected is None:
+                start, end = doc_ranges[doc]
+                with stage("selection", end - start):
+                    selected = self._select(vector, scores, scorer, start, end, top_k, min_score, rescore)
+
+            indices, doc_scores = selected
+            if not len(indices):
+                continue
+            returned += 1
+            yield doc, [dict(rows[i], score=float(score)) for i, score in zip(indices, doc_scores)]
+
+    def _select(self, vector, scores, scorer, start, end, top_k, min_score, rescore=False):
+        """
+        Sélectionne les meilleurs énoncés d'une plage de lignes.
+
+        Returns:
+            indices, scores: Lignes retenues et leurs scores, par score décroissant
+        """
+        # Sur une matrice compacte, les scores sont approchés : on garde plus de
+        # candidats puis on les reclasse sur les scores exacts
+        factor = RESCORE_FACTOR if rescore else 1
+        candidates = top_k_indices(scores[start:end], top_k * factor) + start
+        candidate_scores = scorer.rescore(vector, candidates) if factor > 1 else scores[candidates]
+
+        order = top_k_indices(candidate_scores, top_k, min_score)
+        # Lignes écartées par le préfiltre lexical
+        order = order[np.isfinite(candidate_scores[order])]
+        return candidates[order], candidate_scores[order]
+
+    def _section_scores(self, vector, rows, scorer, section_index):
+        """
+        Recherche hiérarchique : la question est comparée aux sections, puis seulement
+        aux énoncés des top_sections meilleures (sous-sections comprises). Le nombre
+        d'énoncés écartés est ajouté à la trace de la requête ("pruned").
+
+        Returns:
+            scores: Vecteur (N,) de scores exacts, -inf pour les énoncés écartés
+        """
+        with stage("sections", len(section_index)) as current:
+            candidates = section_index.candidates(vector, self.top_sections)
+            current.details["pruned"] = len(rows) - len(candidates)
+
+        with stage("scoring", len(candidates)):
+            scores = np.full(len(rows), -np.inf, dtype=np.float32)
+            if len(candidates):
+                scores[candidates] = scorer.rescore(vector, candidates)
+        return scores
+
+    def _hybrid_scores(self, query, vector, rows, scorer, lexical):
+        """
+        Scores de la question avec l'index BM25 : préfiltre des candidats et/ou fusion.
+
+        Avec le préfiltre, seules les lignes candidates reçoivent un score dense (les
+        autres valent -inf) ; sans matrice, leurs embeddings sont calculés à la demande.
+        Avec la fusion, le score BM25 normalisé est mêlé au score dense.
+
+        Returns:
+            scores: Vecteur (N,) de scores exacts
+        """
+        with stage("prefilter", len(rows)):
+            if self.prefilter:
+                candidates, lexical_scores = lexical.candidates(query, self.prefilter)
+            else:
+                candidates, lexical_scores = None, lexical.scores(query)
+
+        with stage("scoring", len(rows) if candidates is None else len(candidates)):
+            if candidates is None:
+                dense = scorer.scores(vector)
+            elif scorer is None:
+                vectors = self._embeddings([rows[i]["text"] for i in candidates], deferred=True)
+                dense = vectors @ vector if len(candidates) else np.zeros(0, dtype=np.float32)
+            else:
+                dense = scorer.rescore(vector, candidates)
+
+            if self.fusion and len(lexical_scores) and lexical_scores.max() > 0:
+                dense = (1 - self.fusion) * dense + self.fusion * lexical_scores / lexical_scores.max()
+
+            if candidates is None:
+                return np.asarray(dense, dtype=np.float32)
+            scores = np.full(len(rows), -np.inf, dtype=np.float32)
+            scores[candidates] = dense
+            return scores
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+
+STORE_DIR = ".cache/embeddings"
+# Vecteurs encodés au fil des requêtes : écrits sur disque par lots, après ce délai (s)
+FLUSH_DELAY = 30.0
+
+
+class EmbeddingStore:
+    """
+    Stockage persistant des embeddings d'énoncés pour un couple (modèle, pooling).
+
+    Les vecteurs sont conservés dans une matrice float32 contiguë, chaque texte
+    étant repéré par le hash de son contenu (index hash -> ligne).
+
+    Chaque enregistrement écrit une nouvelle matrice sous un nom unique, puis
+    remplace le fichier d'index, qui désigne la matrice à laquelle il correspond :
+    le remplacement de l'index change la paire entière en une seule opération, même
+    si plusieurs processus enregistrent le même stockage.
+    """
+
+    def __init__(self, model_name, pooling, directory=STORE_DIR):
+        """
+        Initialise le stockage et recharge les vecteurs déjà calculés.
+
+        Args:
+            model_name: Nom du modèle ayant produit les vecteurs
+            pooling: Mode de réduction utilisé ("mean", "cls", ...)
+            directory: Dossier de stockage sur disque
+        """
+        self.model_name = model_name
+        self.pooling = pooling
+        self.directory = directory
+        self.name = f"{model_name.replace('/', '--')}-{pooling}"
+        self.index_path = os.path.join(directory, self.name + ".json")
+
+        self.vectors = None
+        self.index = {}
+        # Vecteurs encodés mais pas encore ajoutés à la matrice (clé -> vecteur)
+        self.pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flush_timer = None
+        self.load()
+
+    @staticmethod
+    def key(text):
+        """Renvoie la clé de stockage d'un texte (hash de son contenu)."""
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, text):
+        return self.key(text) in self.index
+
+    def _read_index(self):
+        """
+        Returns:
+            matrix_name, index: Fichier de la matrice et index hash -> ligne, ou (None, None)
+        """
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        return data.get("matrix"), data.get("index")
+
+    def load(self):
+        """Recharge la matrice et l'index depuis le disque s'ils existent."""
+        # Un autre processus peut remplacer la paire (et supprimer l'ancienne matrice)
+        # entre la lecture de l'index et l'ouverture de la matrice : on relit alors l'index
+        for _ in range(3):
+            matrix_name, index = self._read_index()
+            if matrix_name is None or index is None:
+                return
+            try:
+                # Ouverture en memmap : seules les lignes lues sont chargées en mémoire
+                vectors = np.load(os.path.join(self.directory, matrix_name), mmap_mode="r")
+            except FileNotFoundError:
+                continue
+
+            # Fichiers incohérents : on repart de zéro
+            if len(vectors) != len(index):
+                return
+
+            self.vectors = vectors
+            self.index = index
+            return
+
+    def save(self):
+        """Écrit la matrice et l'index sur disque de façon atomique."""
+        with self._write_lock:
+            self._write(self.vectors, self.index)
+
+    def _write(self, vectors, index):
+        """Écrit une matrice et son index sur disque de façon atomique."""
+        if vectors is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Matrice sous un nom propre à cet appel : plusieurs processus (workers) peuvent
+        # enregistrer le même stockage en même temps
+        fd, matrix_path = tempfile.mkstemp(dir=self.directory, prefix=self.name + ".", suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, vectors)
+        fd, index_tmp = tempfile.mkstemp(dir=self.directory, prefix=self.name + ".", suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"matrix": os.path.basename(matrix_path), "index": index}, f)
+
+        previous, _ = self._read_index()
+        os.replace(index_tmp, self.index_path)
+        # Les processus qui ont ouvert l'ancienne matrice en memmap la gardent lisible
+        if previous is not None and previous != os.path.basename(matrix_path):
+            try:
+                os.remove(os.path.join(self.directory, previous))
+            except FileNotFoundError:
+                pass
+
+    def add(self, text_list, embeddings, hashed=False):
+        """
+        Ajoute des vecteurs au stockage (les textes déjà présents sont ignorés).
+
+        Args:
+            text_list: Textes correspondant aux vecteurs (ou leurs clés si hashed)
+            embeddings: Matrice (N, D) des vecteurs
+            hashed: text_list contient déjà les clés des textes
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        new_rows = []
+        for text, vector in zip(text_list, embeddings):
+            key = text if hashed else self.key(text)
+            if key not in self.index:
+                self.index[key] = len(self.index)
+                new_rows.append(vector)
+
+        if not new_rows:
+            return
+        new_rows = np.stack(new_rows)
+        self.vectors = new_rows if self.vectors is None else np.concatenate([self.vectors, new_rows])
+
+    def rows(self, text_list):
+        """Renvoie les lignes des textes dans la matrice (-1 si absent)."""
+        return np.array([self.index.get(self.key(text), -1) for text in text_list], dtype=np.int64)
+
+    def get_or_encode(self, text_list, encode):
+        """
+        Renvoie les embeddings des textes en n'encodant que ceux jamais vus.
+
+        Args:
+            text_list: Textes dont on veut les vecteurs
+            encode: Fonction liste de textes -> matrice (N, D) de vecteurs
+
+        Returns:
+            embeddings: Matrice float32 (N, D), dans l'ordre de text_list
+        """
+        with self._lock:
+            rows = self.rows(text_list)
+            missing = list(dict.fromkeys(text for text, row in zip(text_list, rows) if row < 0))
+
+            if missing:
+                self.add(missing, encode(missing))
+                self.save()
+                rows = self.rows(text_list)
+
+            if self.vectors is None:
+                return np.zeros((0, 0), dtype=np.float32)
+            return self.vectors[rows]
+
+    def get_or_encode_deferred(self, text_list, encode, delay=FLUSH_DELAY):
+        """
+        Variante de get_or_encode pour le chemin des requêtes : les vecteurs manquants
+        sont gardés en mémoire et ajoutés au fichier plus tard, par lots (voir flush),
+        au lieu de réécrire toute la matrice à chaque question. L'encodage se fait hors
+        du verrou.
+
+        Args:
+            text_list: Textes dont on veut les vecteurs
+            encode: Fonction liste de textes -> matrice (N, D) de vecteurs
+            delay: Délai (s) avant l'écriture des nouveaux vecteurs
+
+        Returns:
+            embeddings: Matrice float32 (N, D), dans l'ordre de text_list
+        """
+        keys = [self.key(text) for text in text_list]
+        with self._lock:
+            missing = {key: text for key, text in zip(keys, text_list)
+                       if key not in self.index and key not in self.pending}
+
+        if missing:
+            vectors = np.asarray(encode(list(missing.values())), dtype=np.float32)
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    self.pending.setdefault(key, vector)
+            self._schedule_flush(delay)
+
+        with self._lock:
+            vectors, index, pending = self.vectors, self.index, self.pending
+            found = [pending[key] if key in pending else vectors[index[key]] for key in keys]
+        if not found:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack(found).astype(np.float32, copy=False)
+
+    def _schedule_flush(self, delay):
+        """Programme l'écriture des vecteurs en attente, si elle ne l'est pas déjà."""
+        with self._lock:
+            if self._flush_timer is not None:
+                return
+            self._flush_timer = threading.Timer(delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """
+        Ajoute à la matrice les vecteurs en attente et l'enregistre. L'écriture se fait
+        hors du verrou, sur une copie de l'index : les requêtes ne l'attendent pas.
+        """
+        with self._lock:
+            self._flush_timer = None
+            if not self.pending:
+                return
+            keys = [key for key in self.pending if key not in self.index]
+            if keys:
+                self.add(keys, np.stack([self.pending[key] for key in keys]), hashed=True)
+            self.pending = {}
+            vectors, index = self.vectors, dict(self.index)
+
+        with self._write_lock:
+            self._write(vectors, index)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(model_name, pooling, directory=STORE_DIR):
+    """Renvoie le stockage partagé associé à (modèle, pooling), créé au premier appel."""
+    key = (model_name, pooling, directory)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = EmbeddingStore(model_name, pooling, directory)
+        return _stores[key]
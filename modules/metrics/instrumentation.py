@@ -0,0 +1,159 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Bornes (en secondes) des histogrammes de durée
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Histogramme cumulatif au format Prometheus (compteurs par borne, somme, total)."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Enregistre une valeur."""
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+
+
+class Metrics:
+    """
+    Registre des métriques du processus : durée et nombre d'éléments de chaque étape,
+    plus des jauges calculées à la demande (file d'attente, caches...).
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self.items = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, duration, items=None):
+        """Enregistre la durée (s) et le nombre d'éléments traités par une étape."""
+        with self._lock:
+            if stage not in self.durations:
+                self.durations[stage] = Histogram()
+                self.items[stage] = 0
+            if items is not None:
+                self.items[stage] += items
+        self.durations[stage].observe(duration)
+
+    def register_gauge(self, name, fn, help_text="", labels=None):
+        """
+        Déclare une jauge dont la valeur est lue par fn() à chaque export.
+
+        Args:
+            name: Nom de la métrique
+            fn: Fonction sans argument renvoyant la valeur
+            help_text: Description de la métrique
+            labels: Dictionnaire d'étiquettes (facultatif)
+        """
+        label_text = ",".join(f'{key}="{value}"' for key, value in sorted((labels or {}).items()))
+        with self._lock:
+            self.gauges.setdefault(name, (help_text, {}))[1][label_text] = fn
+
+    def prometheus_text(self):
+        """Exporte les métriques au format texte de Prometheus."""
+        lines = [
+            "# HELP ianis_stage_duration_seconds Duration of each query pipeline stage.",
+            "# TYPE ianis_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            stages = sorted(self.durations.items())
+            items = dict(self.items)
+
+        for stage, histogram in stages:
+            with histogram._lock:
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'ianis_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'ianis_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'ianis_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'ianis_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        lines.append("# HELP ianis_stage_items_total Items processed by each query pipeline stage.")
+        lines.append("# TYPE ianis_stage_items_total counter")
+        for stage, count in sorted(items.items()):
+            lines.append(f'ianis_stage_items_total{{stage="{stage}"}} {count}')
+
+        with self._lock:
+            gauges = sorted((name, help_text, dict(series)) for name, (help_text, series) in self.gauges.items())
+
+        for name, help_text, series in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for label_text, fn in sorted(series.items()):
+                try:
+                    value = fn()
+                except Exception:
+                    continue
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+_trace = contextvars.ContextVar("ianis_trace", default=None)
+
+
+@contextmanager
+def request_trace():
+    """
+    Collecte les étapes exécutées pendant une requête (dans le thread courant).
+
+    Exemple :
+        with request_trace() as trace:
+            main(question)
+        trace  # [{"stage": "encoding", "duration_ms": 12.3, "items": 1}, ...]
+    """
+    trace = []
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+
+class Stage:
+    """
+    Mesure d'une étape ; le nombre d'éléments peut être fixé pendant son exécution,
+    et des informations propres à l'étape ajoutées à la trace via details.
+    """
+
+    def __init__(self, name, items=None):
+        self.name = name
+        self.items = items
+        self.details = {}
+
+
+@contextmanager
+def stage(name, items=None):
+    """
+    Mesure la durée d'une étape du pipeline et l'enregistre dans les métriques
+    globales, ainsi que dans la trace de la requête en cours s'il y en a une.
+
+    Args:
+        name: Nom de l'étape ("extraction", "encoding", "scoring", ...)
+        items: Nombre d'éléments traités (modifiable via l'objet renvoyé)
+    """
+    current = Stage(name, items)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        duration = time.perf_counter() - start
+        metrics.record(name, duration, current.items)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append({"stage": name, "duration_ms": duration * 1000, "items": current.items, **current.details})
@@ -1 +1,3 @@
-from .extractor import *
\ No newline at end of file
+from .extractor import *
+from .parallel import *
+from .corpus import *
\ No newline at end of file
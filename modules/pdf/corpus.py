@@ -0,0 +1,279 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from .extractor import STATEMENT_PREFIX
+from .parallel import extract_pdfs
+from ..analyzer.lexical import structure_terms
+from ..metrics import stage
+
+INDEX_DIR = ".cache"
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Calcule le hash SHA-256 du contenu d'un fichier, par blocs."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class CorpusIndex:
+    """
+    Index persistant de la structure des PDF d'un dossier.
+
+    Chaque PDF n'est analysé qu'une fois : sa structure (sections et énoncés) et les
+    mots de ses énoncés (pour l'index BM25) sont conservés sur disque avec un
+    manifeste (taille, date de modification, hash, et l'erreur si l'analyse a échoué).
+    Seuls les fichiers ajoutés, modifiés ou supprimés sont ré-indexés.
+    """
+
+    def __init__(self, corpus_dir, index_path=None, statement_prefix=STATEMENT_PREFIX, workers=None):
+        """
+        Initialise l'index et recharge l'état enregistré s'il existe.
+
+        Args:
+            corpus_dir: Dossier contenant les PDF
+            index_path: Fichier de l'index (par défaut dans INDEX_DIR)
+            statement_prefix: Préfixe des identifiants d'énoncés
+            workers: Nombre de processus pour l'analyse des PDF (par défaut le nombre de cœurs)
+        """
+        self.corpus_dir = corpus_dir
+        self.workers = workers
+        self.statement_prefix = statement_prefix if isinstance(statement_prefix, str) else list(statement_prefix)
+        if index_path is None:
+            name = os.path.abspath(corpus_dir).strip(os.sep).replace(os.sep, "--")
+            index_path = os.path.join(INDEX_DIR, f"corpus-{name}.json")
+        self.index_path = index_path
+
+        self.version = 0
+        self.manifest = {}
+        self.documents = {}
+
+        self._lock = threading.RLock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.load()
+
+    def load(self):
+        """Recharge l'index depuis le disque s'il existe."""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.version = data.get("version", 0)
+
+        # Les énoncés ont été détectés avec un autre préfixe : tout est à ré-indexer
+        if data.get("statement_prefix", STATEMENT_PREFIX) != self.statement_prefix:
+            return
+
+        self.manifest = data.get("manifest", {})
+        self.documents = data.get("documents", {})
+
+    def save(self):
+        """Écrit l'index sur disque de façon atomique."""
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "version": self.version,
+            "statement_prefix": self.statement_prefix,
+            "manifest": self.manifest,
+            "documents": self.documents,
+        }
+        # Fichier temporaire propre à cet appel : plusieurs processus peuvent écrire en même temps
+        fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=os.path.basename(self.index_path) + ".", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def document_name(filename):
+        """Nom du document tel qu'affiché (nom de fichier sans l'extension)."""
+        return filename[:-4]
+
+    def scan(self):
+        """Liste les PDF présents dans le dossier du corpus."""
+        return sorted(f for f in os.listdir(self.corpus_dir) if f.lower().endswith(".pdf"))
+
+    def changes(self):
+        """
+        Compare le dossier au manifeste.
+
+        Returns:
+            added, changed, removed: Listes de noms de fichiers
+        """
+        files = self.scan()
+        added, changed = [], []
+
+        for filename in files:
+            entry = self.manifest.get(filename)
+            if entry is None:
+                added.append(filename)
+                continue
+            stat = os.stat(os.path.join(self.corpus_dir, filename))
+            if stat.st_size != entry["size"] or stat.st_mtime != entry["mtime"]:
+                changed.append(filename)
+
+        removed = [filename for filename in self.manifest if filename not in files]
+        return added, changed, removed
+
+    def refresh(self):
+        """
+        Ré-indexe les fichiers ajoutés, modifiés ou supprimés depuis le dernier passage.
+        Les PDF à analyser sont traités en parallèle.
+
+        Returns:
+            added, changed, removed: Les fichiers effectivement pris en compte
+        """
+        with self._lock:
+            added, changed, removed = self.changes()
+            updated = False
+            touched = False
+
+            entries = {}
+            for filename in added + changed:
+                path = os.path.join(self.corpus_dir, filename)
+                stat = os.stat(path)
+                digest = file_hash(path)
+                entry = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest}
+
+                # Date modifiée sans changement de contenu : pas besoin de ré-analyser
+                # (ni de réessayer un fichier dont l'analyse a échoué)
+                previous = self.manifest.get(filename)
+                if previous is not None and previous["sha256"] == digest:
+                    if "error" in previous:
+                        entry["error"] = previous["error"]
+                    self.manifest[filename] = entry
+                    changed.remove(filename)
+                    touched = True
+                    continue
+
+                entries[filename] = entry
+
+            paths = [os.path.join(self.corpus_dir, filename) for filename in entries]
+            with stage("extraction", len(paths)):
+                documents, errors, retries = extract_pdfs(paths, self.statement_prefix, self.workers)
+
+            for filename, entry in entries.items():
+                path = os.path.join(self.corpus_dir, filename)
+                if path in retries:
+                    # Échec du traitement et non du fichier : le manifeste n'est pas mis à
+                    # jour, le fichier sera réessayé au prochain passage
+                    logger.warning("Indexing of %s will be retried: %s", path, retries[path])
+                    if filename in added:
+                        added.remove(filename)
+                    else:
+                        changed.remove(filename)
+                    continue
+                if path in errors:
+                    logger.error("Error while indexing %s: %s", path, errors[path])
+                    if filename in added:
+                        added.remove(filename)
+                    else:
+                        changed.remove(filename)
+                    # L'échec est enregistré : le fichier n'est réessayé qu'une fois modifié
+                    self.manifest[filename] = dict(entry, error=str(errors[path]))
+                    if self.documents.pop(self.document_name(filename), None) is not None:
+                        updated = True
+                    touched = True
+                    continue
+
+                document = documents[path]
+                document["terms"] = structure_terms(document["structure"])
+                self.documents[self.document_name(filename)] = document
+                self.manifest[filename] = entry
+                updated = True
+
+            for filename in removed:
+                self.manifest.pop(filename, None)
+                touched = True
+                if self.documents.pop(self.document_name(filename), None) is not None:
+                    updated = True
+
+            if updated:
+                self.version += 1
+                logger.info("Corpus %s indexed (version %d): %d added, %d changed, %d removed",
+                            self.corpus_dir, self.version, len(added), len(changed), len(removed))
+            if updated or touched:
+                self.save()
+
+            return added, changed, removed
+
+    def watch(self, interval=10.0, on_change=None):
+        """
+        Lance un thread qui vérifie périodiquement le dossier et ré-indexe les changements.
+
+        Args:
+            interval: Délai en secondes entre deux vérifications
+            on_change: Fonction appelée (sans argument) après chaque nouvelle version du corpus
+        """
+        if self.watching():
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    version = self.version
+                    self.refresh()
+                    if on_change is not None and self.version != version:
+                        on_change()
+                except Exception:
+                    logger.exception("Error while watching %s", self.corpus_dir)
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=run, name="corpus-watcher", daemon=True)
+        self._watcher.start()
+
+    def watching(self):
+        """Indique si le thread de surveillance est actif."""
+        return self._watcher is not None and self._watcher.is_alive()
+
+    def stop_watching(self):
+        """Arrête le thread de surveillance."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def names(self):
+        """Noms des documents indexés."""
+        with self._lock:
+            return sorted(self.documents)
+
+    def structure(self, name):
+        """Structure (sections -> énoncés) d'un document indexé."""
+        with self._lock:
+            return self.documents[name]["structure"]
+
+    def structures(self):
+        """Structures de tous les documents indexés (nom -> sections -> énoncés)."""
+        with self._lock:
+            return {name: document["structure"] for name, document in self.documents.items()}
+
+    def terms(self):
+        """Mots des énoncés de tous les documents indexés (nom -> une liste de mots par énoncé)."""
+        with self._lock:
+            return {name: document["terms"] for name, document in self.documents.items() if "terms" in document}
+
+    def sections(self):
+        """Sections détectées dans chaque document indexé (nom -> liste de sections)."""
+        with self._lock:
+            return {name: document.get("sections", []) for name, document in self.documents.items()}
+
+    def snapshot(self):
+        """
+        Lit en une fois, sous le verrou, tout ce qu'il faut pour construire un index :
+        une actualisation ne peut pas survenir entre la lecture des structures et celle
+        de la version.
+
+        Returns:
+            structures, version, terms, sections: Voir structures, terms et sections
+        """
+        with self._lock:
+            return self.structures(), self.version, self.terms(), self.sections()
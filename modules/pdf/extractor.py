@@ -1,6 +1,230 @@
+import logging
 import re
 import fitz  # PyMuPDF
-from collections import defaultdict
+from bisect import bisect_right
+
+STATEMENT_PREFIX = "VUL"
+
+logger = logging.getLogger(__name__)
+
+
+class PDFExtractionError(Exception):
+    """Erreur levée lorsqu'un PDF ne peut pas être ouvert ou lu."""
+
+# Différents modèles de titres de section
+SECTION_PATTERNS = [
+    # Format: "1. Titre de section"
+    (re.compile(r'^\s*(\d+)\.\s+([A-Z][\w\s\-\',:]+)$'), 1),
+    # Format: "1.1 Titre de sous-section"
+    (re.compile(r'^\s*(\d+\.\d+)\s+([A-Z][\w\s\-\',:]+)$'), 2),
+    # Format: "1.1.1 Titre de sous-sous-section"
+    (re.compile(r'^\s*(\d+\.\d+\.\d+)\s+([A-Z][\w\s\-\',:]+)$'), 3),
+    # Format: "I. Titre de section (chiffres romains)"
+    (re.compile(r'^\s*(I{1,3}|IV|V|VI{1,3}|IX|X)\.\s+([A-Z][\w\s\-\',:]+)$'), 1),
+    # Format: "A. Titre de section (lettres)"
+    (re.compile(r'^\s*([A-Z])\.\s+([A-Z][\w\s\-\',:]+)$'), 1),
+]
+
+# Lignes de pied ou d'en-tête de page (impression depuis un navigateur notamment)
+FOOTER_PATTERNS = [
+    # Format: "20/03/2025 17:33"
+    re.compile(r'^\d{1,2}/\d{1,2}/\d{2,4}(\s+\d{1,2}:\d{2})?$'),
+    # Format: "2/3", "Page 2", "Page 2 sur 3"
+    re.compile(r'^(page\s+)?\d+(\s*(/|sur|of)\s*\d+)?$', re.IGNORECASE),
+    # Format: "https://stackedit.io/app#"
+    re.compile(r'^https?://\S+$'),
+]
+
+
+def statement_patterns(prefix=STATEMENT_PREFIX):
+    """
+    Compile les modèles d'énoncés pour un préfixe donné ("VUL" pour "VUL-1:", "E" pour "E1 :").
+
+    Args:
+        prefix: Préfixe des identifiants d'énoncés, ou liste de préfixes
+
+    Returns:
+        patterns: Liste d'expressions régulières compilées
+    """
+    prefixes = [prefix] if isinstance(prefix, str) else list(prefix)
+    names = "|".join(re.escape(p) for p in prefixes)
+    return [
+        re.compile(rf'^\s*((?:{names})-?[0-9]+)\s*[:. ]\s*(.*?)$', re.IGNORECASE),
+        #re.compile(r'^\s*([A-Z0-9][\w\-]+)\s*:\s*(.*?)$'),
+    ]
+
+
+def match_section(line):
+    """Renvoie (id, titre, niveau) si la ligne est un titre de section, sinon None."""
+    for pattern, level in SECTION_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            return match.group(1), match.group(2).strip(), level
+    return None
+
+
+def is_footer(line):
+    """Indique si la ligne ressemble à une ligne de pied de page (date, numéro de page, adresse)."""
+    return any(pattern.match(line) for pattern in FOOTER_PATTERNS)
+
+
+def match_statement(line, patterns):
+    """Renvoie (id, début du texte) si la ligne commence un énoncé, sinon None."""
+    for pattern in patterns:
+        match = pattern.match(line)
+        if match:
+            return match.group(1), match.group(2)
+    return None
+
+
+class StructureParser:
+    """
+    Analyseur en une passe des lignes d'un document : détecte à la fois les
+    sections et les énoncés (avec leurs lignes de continuation).
+    Les lignes sont fournies une par une, ce qui permet de l'alimenter au fil de l'eau.
+
+    Par défaut, un énoncé se poursuit jusqu'à une ligne vide ou au prochain énoncé,
+    comme dans l'algorithme d'origine. Avec stop_at_titles, il se termine aussi à un
+    titre de section ou à une ligne de pied de page : c'est le mode de l'analyse page
+    par page, où un énoncé peut se poursuivre sur la page suivante (voir page_break).
+    """
+
+    def __init__(self, statement_prefix=STATEMENT_PREFIX, detect_sections=True, stop_at_titles=False):
+        """
+        Initialise un analyseur vide.
+
+        Args:
+            statement_prefix: Préfixe des identifiants d'énoncés
+            detect_sections: Détecter aussi les titres de section
+            stop_at_titles: Terminer un énoncé à un titre de section ou à un pied de page
+        """
+        self.patterns = statement_patterns(statement_prefix)
+        self.detect_sections = detect_sections
+        self.stop_at_titles = stop_at_titles
+        self.sections = []
+        self.statements = []
+        self.line_num = 0
+        self._current = None
+
+    def feed(self, line):
+        """Traite la ligne suivante du document."""
+        line_num = self.line_num
+        self.line_num += 1
+
+        line = line.strip()
+        if not line:
+            # Une ligne vide termine l'énoncé en cours
+            self._close_statement()
+            return
+
+        if self.stop_at_titles and is_footer(line):
+            self._close_statement()
+            return
+
+        section = match_section(line)
+        if section is not None and self.stop_at_titles:
+            # Même si les sections sont détectées à part (detect_sections=False)
+            self._close_statement()
+        if section is not None and self.detect_sections:
+            section_id, section_title, level = section
+            self.sections.append({
+                'id': section_id,
+                'title': section_title,
+                'level': level,
+                'line': line_num
+            })
+
+        statement = match_statement(line, self.patterns)
+        if statement is not None:
+            self._close_statement()
+            statement_id, statement_text_start = statement
+            self._current = {
+                'section': len(self.sections) - 1,
+                'id': statement_id,
+                'text': statement_text_start,
+                'line': line_num,
+            }
+        elif self._current is not None:
+            # Ligne de continuation de l'énoncé en cours
+            self._current['text'] += "\n" + line
+
+    def page_break(self):
+        """
+        Signale un changement de page. La numérotation des lignes reste celle du texte
+        complet, où les pages sont séparées par une ligne vide, mais l'énoncé en cours
+        n'est pas terminé.
+        """
+        self.line_num += 1
+
+    def _close_statement(self):
+        """Termine l'énoncé en cours."""
+        if self._current is not None:
+            self.statements.append(self._current)
+            self._current = None
+
+    def close(self):
+        """Signale la fin du document."""
+        self._close_statement()
+
+    def fill_structure(self, structure):
+        """
+        Remplit le dictionnaire section -> énoncés à partir des éléments détectés.
+
+        Args:
+            structure: Dictionnaire à compléter (titre de section -> liste d'énoncés)
+        """
+        for section in self.sections:
+            structure[section['title']] = []
+
+        for statement in self.statements:
+            index = statement['section']
+            section_title = self.sections[index]['title'] if index >= 0 else None
+            add_statement(structure, section_title, statement)
+
+        return structure
+
+
+def add_statement(structure, section_title, statement):
+    """Ajoute un énoncé détecté à la structure, sous le titre de sa section."""
+    # hotfix
+    if section_title == None:
+        section_title = 'None'
+        if section_title not in structure: structure[section_title] = []
+
+    structure[section_title].append({
+        'id': statement['id'],
+        'text': statement['text'].strip(),
+        'line': statement['line'],
+    })
+
+
+def count_span(font_stats, key, text, examples=3):
+    """
+    Compte un span de texte pour une police : nombre de spans, longueur totale
+    et quelques exemples, sans conserver tous les textes.
+
+    Args:
+        font_stats: Dictionnaire (police, taille) -> [nombre, longueur totale, exemples]
+        key: Couple (police, taille)
+        text: Texte du span
+        examples: Nombre d'exemples conservés
+    """
+    stats = font_stats.get(key)
+    if stats is None:
+        stats = font_stats[key] = [0, 0, []]
+    stats[0] += 1
+    stats[1] += len(text)
+    if len(stats[2]) < examples:
+        stats[2].append(text)
+
+
+def merge_font_stats(font_stats, other, examples=3):
+    """Ajoute à font_stats les compteurs de polices d'une autre plage de pages."""
+    for key, (count, length, texts) in other.items():
+        stats = font_stats.setdefault(key, [0, 0, []])
+        stats[0] += count
+        stats[1] += length
+        stats[2].extend(texts[:examples - len(stats[2])])
 
 
 class PDFStructureAnalyzer:
@@ -9,50 +233,99 @@ class PDFStructureAnalyzer:
     Permet de détecter les parties, sections, sous-sections et énoncés.
     """
     
-    def __init__(self, pdf_path):
-        """Initialise l'analyseur avec le chemin du fichier PDF."""
+    def __init__(self, pdf_path, statement_prefix=STATEMENT_PREFIX):
+        """Initialise l'analyseur avec le chemin du fichier PDF et le préfixe des énoncés."""
         self.pdf_path = pdf_path
+        self.statement_prefix = statement_prefix
         self.text_content = ""
+        self._lines = None
         self.pages_content = []
         self.structure = {}
         self.sections = []
         self.section_levels = {}
-        self.font_stats = defaultdict(list)
+        self.font_stats = {}
         self.statements = []
     
-    def extract_with_pymupdf(self):
+    def extract_with_pymupdf(self, start=0, end=None):
         """
         Extrait le texte avec PyMuPDF (fitz) qui préserve mieux la mise en forme
         et fournit des informations sur les styles.
+
+        Args:
+            start: Première page à extraire
+            end: Page de fin (exclue), par défaut la fin du document
+
+        Raises:
+            PDFExtractionError: Si le fichier ne peut pas être ouvert ou lu
         """
         self.pages_content = []
         self.font_sizes = []
         
         try:
             with fitz.open(self.pdf_path) as doc:
-                for page_num, page in enumerate(doc):
-                    # Extraire le texte de la page
-                    text = page.get_text()
-                    self.pages_content.append(text)
-                    
-                    # Collecter des informations sur les polices pour l'analyse structurelle
-                    blocks = page.get_text("dict")["blocks"]
-                    for block in blocks:
-                        if "lines" in block:
-                            for line in block["lines"]:
-                                for span in line["spans"]:
-                                    font_size = span["size"]
-                                    font_name = span["font"]
-                                    text = span["text"]
-                                    if text.strip():  # Ignorer le texte vide
-                                        self.font_stats[(font_name, font_size)].append(text)
+                end = len(doc) if end is None else min(end, len(doc))
+                for page_num in range(start, end):
+                    # Texte de la page (identique à page.get_text()) et polices, en une extraction
+                    lines = self._page_lines(doc[page_num])
+                    self.pages_content.append('\n'.join(lines) + '\n' if lines else '')
                 
                 self.text_content = '\n'.join(self.pages_content)
+                self._lines = None
                 return self.text_content
         except Exception as e:
-            print(f"Error while openning {self.pdf_path}")
-            exit(1)
+            # Pas d'exit() ici : l'appelant (éventuellement un processus du pool) décide
+            raise PDFExtractionError(f"Error while openning {self.pdf_path}: {e}") from e
+
+    def _page_lines(self, page):
+        """
+        Lignes d'une page à partir d'une seule extraction get_text("dict"), en
+        comptant au passage les polices pour l'analyse structurelle.
+        """
+        lines = []
+        for block in page.get_text("dict")["blocks"]:
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    if span["text"].strip():  # Ignorer le texte vide
+                        count_span(self.font_stats, (span["font"], span["size"]), span["text"])
+                lines.append("".join(span["text"] for span in line["spans"]))
+        return lines
+
+    def iter_pages(self, start=0, end=None):
+        """
+        Parcourt le PDF page par page, sans conserver le texte : seule la page
+        courante est en mémoire. Les compteurs de polices sont mis à jour au passage.
+
+        Args:
+            start: Première page à extraire
+            end: Page de fin (exclue), par défaut la fin du document
+
+        Yields:
+            lines: Lignes de chaque page, dans l'ordre du document
+
+        Raises:
+            PDFExtractionError: Si le fichier ne peut pas être ouvert ou lu
+        """
+        try:
+            doc = fitz.open(self.pdf_path)
+        except Exception as e:
+            raise PDFExtractionError(f"Error while openning {self.pdf_path}: {e}") from e
+
+        with doc:
+            end = len(doc) if end is None else min(end, len(doc))
+            for page_num in range(start, end):
+                try:
+                    lines = self._page_lines(doc[page_num])
+                except Exception as e:
+                    raise PDFExtractionError(f"Error while reading {self.pdf_path}: {e}") from e
+                yield lines
     
+    @property
+    def lines(self):
+        """Lignes du texte extrait, découpées une seule fois."""
+        if self._lines is None:
+            self._lines = self.text_content.split('\n')
+        return self._lines
+
     def identify_titles_by_font(self):
         """
         Identifie les titres potentiels en fonction des caractéristiques des polices.
@@ -60,13 +333,12 @@ class PDFStructureAnalyzer:
         """
         # Calculer la fréquence et les statistiques de chaque combinaison de police/taille
         font_info = {}
-        for (font_name, size), texts in self.font_stats.items():
-            total_length = sum(len(text) for text in texts)
-            avg_length = total_length / len(texts) if texts else 0
+        for (font_name, size), (count, total_length, examples) in self.font_stats.items():
+            avg_length = total_length / count if count else 0
             font_info[(font_name, size)] = {
-                'count': len(texts),
+                'count': count,
                 'avg_length': avg_length,
-                'examples': texts[:3]  # Quelques exemples pour l'inspection
+                'examples': examples  # Quelques exemples pour l'inspection
             }
         
         # Trier par taille de police (décroissante)
@@ -85,43 +357,25 @@ class PDFStructureAnalyzer:
         Détecte les sections en utilisant des expressions régulières pour identifier
         les modèles de numérotation courants dans les documents.
         """
-        # Différents modèles de titres de section
-        patterns = [
-            # Format: "1. Titre de section"
-            (r'^\s*(\d+)\.\s+([A-Z][\w\s\-\',:]+)$', 1),
-            # Format: "1.1 Titre de sous-section"
-            (r'^\s*(\d+\.\d+)\s+([A-Z][\w\s\-\',:]+)$', 2),
-            # Format: "1.1.1 Titre de sous-sous-section"
-            (r'^\s*(\d+\.\d+\.\d+)\s+([A-Z][\w\s\-\',:]+)$', 3),
-            # Format: "I. Titre de section (chiffres romains)"
-            (r'^\s*(I{1,3}|IV|V|VI{1,3}|IX|X)\.\s+([A-Z][\w\s\-\',:]+)$', 1),
-            # Format: "A. Titre de section (lettres)"
-            (r'^\s*([A-Z])\.\s+([A-Z][\w\s\-\',:]+)$', 1),
-        ]
-        
         sections = []
-        section_levels = {}
-        
+
         # Parcourir chaque ligne du document
-        for line_num, line in enumerate(self.text_content.split('\n')):
+        for line_num, line in enumerate(self.lines):
             line = line.strip()
             if not line:
                 continue
-                
+
             # Vérifier si la ligne correspond à un modèle de titre
-            for pattern, level in patterns:
-                match = re.match(pattern, line)
-                if match:
-                    section_id = match.group(1)
-                    section_title = match.group(2).strip()
-                    sections.append({
-                        'id': section_id,
-                        'title': section_title,
-                        'level': level,
-                        'line': line_num
-                    })
-                    self.structure[section_title] = []
-                    break
+            section = match_section(line)
+            if section is not None:
+                section_id, section_title, level = section
+                sections.append({
+                    'id': section_id,
+                    'title': section_title,
+                    'level': level,
+                    'line': line_num
+                })
+                self.structure[section_title] = []
 
         self.sections = sections
 
@@ -130,74 +384,19 @@ class PDFStructureAnalyzer:
         Détecte les énoncés dans le document en recherchant des motifs courants
         comme "E1:", "VULN-1:", etc.
         """
+        # Seuls les énoncés sont recherchés ici, les sections sont déjà connues
+        parser = StructureParser(self.statement_prefix, detect_sections=False)
+        for line in self.lines:
+            parser.feed(line)
+        parser.close()
+
+        # Rattacher chaque énoncé à sa section par recherche dichotomique
+        section_lines = [section['line'] for section in self.sections]
+        for statement in parser.statements:
+            index = bisect_right(section_lines, statement['line']) - 1
+            section_title = self.sections[index]['title'] if index >= 0 else None
+            add_statement(self.structure, section_title, statement)
 
-        STATEMENT_NAME = "VUL"
-        # Différents modèles possibles d'énoncés
-        statement_patterns = [
-            rf'^\s*({STATEMENT_NAME}-?[0-9]+)\s*[:. ]\s*(.*?)$',
-            #r'^\s*([A-Z0-9][\w\-]+)\s*:\s*(.*?)$',
-        ]
-        
-        statements = []
-        
-        # Parcourir chaque ligne pour trouver des énoncés
-        lines = self.text_content.split('\n')
-        for line_num, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-            
-            print(line)
-            # Vérifier si la ligne correspond à un format d'énoncé
-            for pattern in statement_patterns:
-                match = re.match(pattern, line, re.IGNORECASE)
-                
-                if match:
-                    statement_id = match.group(1)
-                    statement_text_start = match.group(2)
-                    
-                    # Initialiser le texte de l'énoncé avec la première ligne
-                    full_statement_text = statement_text_start
-                    
-                    # Chercher si l'énoncé continue sur les lignes suivantes
-                    current_line = line_num + 1
-                    while current_line < len(lines):
-                        next_line = lines[current_line].strip()
-                        
-                        # Arrêter si on trouve un autre énoncé ou une section
-                        is_new_statement = any(re.match(p, next_line, re.IGNORECASE) for p in statement_patterns)
-                        is_section = any(re.match(p[0], next_line) for p in self.section_patterns) if hasattr(self, 'section_patterns') else False
-                        
-                        if is_new_statement or is_section or not next_line:
-                            break
-                            
-                        # Ajouter la ligne au texte de l'énoncé
-                        full_statement_text += "\n" + next_line
-                        current_line += 1
-                    
-                    # Déterminer à quelle section appartient cet énoncé
-                    section_id = None
-                    section_title = None
-                    for i, section in enumerate(self.sections):
-                        if line_num >= section['line']:
-                            if i == len(self.sections) - 1 or line_num < self.sections[i+1]['line']:
-                                section_id = section['id']
-                                section_title = section['title']
-                                break
-                    
-                    # hotfix
-                    if section_title == None: 
-                        section_title = 'None'
-                        if section_title not in self.structure: self.structure[section_title] = []
-
-                    self.structure[section_title].append({
-                        'id': statement_id,
-                        'text': full_statement_text.strip(),
-                        'line': line_num,
-                    })
-                    
-                    break  # Sortir de la boucle des patterns après avoir trouvé une correspondance
-    
     def extract_sections_content(self):
         """
         Extrait le contenu de chaque section identifiée.
@@ -206,7 +405,7 @@ class PDFStructureAnalyzer:
             self.detect_sections_by_regex()
             
         sections_content = {}
-        lines = self.text_content.split('\n')
+        lines = self.lines
         
         # Parcourir les sections identifiées
         for i, section in enumerate(self.sections):
@@ -224,30 +423,67 @@ class PDFStructureAnalyzer:
             
         return sections_content
     
-    def analyze_pdf_structure(self):
+    def parse_structure(self):
         """
-        Méthode principale qui exécute l'analyse complète du PDF.
+        Détecte en une passe les sections et les énoncés du texte déjà extrait.
         """
-        # Data extraction
-        self.extract_with_pymupdf()
-        
-        # Titles info
-        title_levels, font_info = self.identify_titles_by_font()
-        
-        # Detect sections
-        self.detect_sections_by_regex()
+        parser = StructureParser(self.statement_prefix)
+        for line in self.lines:
+            parser.feed(line)
+        parser.close()
+
+        self.sections = parser.sections
+        parser.fill_structure(self.structure)
+
+        return self.structure
+
+    def parse_stream(self, start=0, end=None):
+        """
+        Extrait et analyse le PDF page par page : les lignes de chaque page sont
+        transmises au détecteur de sections et d'énoncés dès leur extraction, sans
+        conserver le texte du document.
+
+        Un énoncé peut se poursuivre sur la page suivante ; il se termine alors aussi
+        à un titre de section ou à une ligne de pied de page (voir StructureParser).
+
+        Args:
+            start: Première page à analyser
+            end: Page de fin (exclue), par défaut la fin du document
+        """
+        parser = StructureParser(self.statement_prefix, stop_at_titles=True)
+        for page_num, lines in enumerate(self.iter_pages(start, end)):
+            if page_num:
+                parser.page_break()
+            for line in lines:
+                parser.feed(line)
+        parser.close()
+
+        self.sections = parser.sections
+        parser.fill_structure(self.structure)
 
-        # Detect statements
-        self.detect_statements()
-        
         return self.structure
 
+    def analyze_pdf_structure(self, stream=False):
+        """
+        Méthode principale qui exécute l'analyse complète du PDF.
+
+        Args:
+            stream: Analyser le PDF page par page, en mémoire bornée (voir parse_stream)
+        """
+        if stream:
+            return self.parse_stream()
+
+        # Data extraction, then sections and statements in a single pass
+        # (titles by font are available through identify_titles_by_font)
+        self.extract_with_pymupdf()
+        return self.parse_structure()
+
 
-def extract_pdf(pdf_path):
+def extract_pdf(pdf_path, statement_prefix=STATEMENT_PREFIX):
     """Fonction pour traiter un PDF et afficher sa structure avec les énoncés."""
-    analyzer = PDFStructureAnalyzer(pdf_path)
+    analyzer = PDFStructureAnalyzer(pdf_path, statement_prefix)
     structure = analyzer.analyze_pdf_structure()
     
-    print(structure)
+    logger.debug("%s: %s", pdf_path, structure)
     return structure
 
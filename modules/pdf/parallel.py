@@ -0,0 +1,169 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+from .extractor import PDFExtractionError, PDFStructureAnalyzer, STATEMENT_PREFIX, merge_font_stats
+
+# Au-delà de ce nombre de pages, un PDF est découpé en plages traitées en parallèle
+PAGES_PER_TASK = 50
+# Erreurs propres au fichier (illisible, corrompu) : le réessayer sans modification échouerait encore
+FILE_ERRORS = (PDFExtractionError, fitz.FileDataError)
+
+
+def page_count(pdf_path):
+    """Renvoie le nombre de pages d'un PDF."""
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+
+def analyze_file(pdf_path, statement_prefix=STATEMENT_PREFIX):
+    """
+    Analyse complète d'un PDF (exécutée dans un processus du pool).
+
+    Returns:
+        document: Dictionnaire {"structure", "sections"}
+    """
+    analyzer = PDFStructureAnalyzer(pdf_path, statement_prefix)
+    structure = analyzer.analyze_pdf_structure()
+    return {"structure": structure, "sections": analyzer.sections}
+
+
+def extract_pages(pdf_path, start, end):
+    """
+    Extrait le texte et les statistiques de polices d'une plage de pages
+    (exécutée dans un processus du pool).
+
+    Returns:
+        pages_content, font_stats: Texte de chaque page et compteurs par (police, taille)
+    """
+    analyzer = PDFStructureAnalyzer(pdf_path)
+    analyzer.extract_with_pymupdf(start, end)
+    return analyzer.pages_content, analyzer.font_stats
+
+
+def merge_pages(pdf_path, chunks, statement_prefix=STATEMENT_PREFIX):
+    """
+    Assemble les plages de pages d'un PDF, dans l'ordre, puis en détecte la structure.
+
+    Args:
+        pdf_path: Chemin du PDF
+        chunks: Liste de (pages_content, font_stats) triée par première page
+        statement_prefix: Préfixe des identifiants d'énoncés
+
+    Returns:
+        document: Dictionnaire {"structure", "sections"}
+    """
+    analyzer = PDFStructureAnalyzer(pdf_path, statement_prefix)
+    for pages_content, chunk_font_stats in chunks:
+        analyzer.pages_content.extend(pages_content)
+        merge_font_stats(analyzer.font_stats, chunk_font_stats)
+
+    analyzer.text_content = '\n'.join(analyzer.pages_content)
+    structure = analyzer.parse_structure()
+    return {"structure": structure, "sections": analyzer.sections}
+
+
+def _pool(workers):
+    """
+    Crée le pool de processus. fork est évité : l'appelant (thread de surveillance du
+    corpus, worker gunicorn) a des threads et des verrous qu'un fork copierait dans un
+    état incohérent. Avec forkserver, les processus sont créés par un serveur qui n'a
+    importé que ce module (et PyMuPDF), pas l'application ; spawn sinon.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+    else:
+        context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(workers, mp_context=context)
+
+
+def pdf_paths_need_split(pdf_paths, pages_per_task):
+    """Indique si l'un des PDF est assez gros pour être découpé en plages de pages."""
+    for pdf_path in pdf_paths:
+        try:
+            if page_count(pdf_path) > pages_per_task:
+                return True
+        except Exception:
+            pass
+    return False
+
+
+def extract_pdfs(pdf_paths, statement_prefix=STATEMENT_PREFIX, workers=None, pages_per_task=PAGES_PER_TASK):
+    """
+    Analyse un ensemble de PDF en parallèle sur un pool de processus.
+
+    Les petits fichiers sont traités entiers par un processus ; les gros fichiers sont
+    découpés en plages de pages extraites en parallèle puis assemblées dans l'ordre.
+    Une erreur sur un fichier n'interrompt pas le traitement des autres.
+
+    Les erreurs propres au fichier (voir FILE_ERRORS) sont distinguées des échecs du
+    traitement lui-même (processus du pool tué, mémoire insuffisante, fichier
+    inaccessible...), qui ne disent rien du fichier et peuvent être réessayés.
+
+    Args:
+        pdf_paths: Chemins des PDF à analyser
+        statement_prefix: Préfixe des identifiants d'énoncés
+        workers: Nombre de processus (par défaut le nombre de cœurs)
+        pages_per_task: Nombre de pages par tâche pour les gros fichiers
+
+    Returns:
+        documents, errors, retries: Dictionnaires chemin -> document, chemin -> message
+        d'erreur du fichier et chemin -> message d'échec à réessayer, dans l'ordre de pdf_paths
+    """
+    pdf_paths = list(pdf_paths)
+    workers = workers or os.cpu_count() or 1
+    documents = {}
+    errors = {}
+    retries = {}
+
+    def fail(pdf_path, e):
+        (errors if isinstance(e, FILE_ERRORS) else retries)[pdf_path] = str(e)
+
+    # Traitement direct sans pool s'il n'y a rien à paralléliser
+    if workers == 1 or (len(pdf_paths) <= 1 and not pdf_paths_need_split(pdf_paths, pages_per_task)):
+        for pdf_path in pdf_paths:
+            try:
+                documents[pdf_path] = analyze_file(pdf_path, statement_prefix)
+            except Exception as e:
+                fail(pdf_path, e)
+        return _ordered(pdf_paths, documents, errors, retries)
+
+    with _pool(workers) as pool:
+        file_futures = {}
+        page_futures = {}
+
+        for pdf_path in pdf_paths:
+            try:
+                n_pages = page_count(pdf_path)
+            except Exception as e:
+                fail(pdf_path, e)
+                continue
+
+            if n_pages > pages_per_task:
+                page_futures[pdf_path] = [
+                    pool.submit(extract_pages, pdf_path, start, start + pages_per_task)
+                    for start in range(0, n_pages, pages_per_task)
+                ]
+            else:
+                file_futures[pdf_path] = pool.submit(analyze_file, pdf_path, statement_prefix)
+
+        for pdf_path, future in file_futures.items():
+            try:
+                documents[pdf_path] = future.result()
+            except Exception as e:
+                fail(pdf_path, e)
+
+        for pdf_path, futures in page_futures.items():
+            try:
+                chunks = [future.result() for future in futures]
+                documents[pdf_path] = merge_pages(pdf_path, chunks, statement_prefix)
+            except Exception as e:
+                fail(pdf_path, e)
+
+    return _ordered(pdf_paths, documents, errors, retries)
+
+
+def _ordered(pdf_paths, *results):
+    """Réordonne les résultats selon l'ordre des chemins fournis."""
+    return tuple({p: result[p] for p in pdf_paths if p in result} for result in results)
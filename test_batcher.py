@@ -0,0 +1,78 @@
+"""
+Regroupement des textes à encoder (MicroBatcher).
+
+    python -m pytest test_batcher.py
+"""
+import threading
+import time
+import numpy as np
+import pytest
+from modules.analyzer import MicroBatcher
+
+
+class GatedEncoder:
+    """Encodeur dont le premier appel attend d'être libéré, pour accumuler des textes."""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        if len(self.calls) == 1:
+            self.started.set()
+            self.release.wait(5)
+        elif self.error is not None:
+            raise self.error
+        return np.array([[float(text)] for text in texts], dtype=np.float32)
+
+
+def test_concurrent_texts_share_one_encode_call():
+    encoder = GatedEncoder()
+    batcher = MicroBatcher(encoder, max_batch_size=16, max_wait_ms=1000)
+    first = batcher.submit("0")
+    assert encoder.started.wait(5)
+
+    # Soumis pendant l'encodage du premier texte : encodés ensemble au passage suivant
+    futures = [batcher.submit(str(i)) for i in range(1, 5)]
+    encoder.release.set()
+
+    assert first.result(5)[0] == 0.0
+    assert [future.result(5)[0] for future in futures] == [1.0, 2.0, 3.0, 4.0]
+    assert encoder.calls == [["0"], ["1", "2", "3", "4"]]
+    assert batcher.stats()["batches"] == 2
+
+
+def test_lone_text_is_sent_at_once():
+    batcher = MicroBatcher(lambda texts: np.zeros((len(texts), 2)), max_wait_ms=5000)
+    start = time.perf_counter()
+    batcher.encode("seul")
+    assert time.perf_counter() - start < 1.0
+
+
+def test_each_future_gets_its_own_row():
+    batcher = MicroBatcher(lambda texts: np.array([[float(text), -float(text)] for text in texts]))
+    futures = {i: batcher.submit(str(i)) for i in range(40)}
+    for i, future in futures.items():
+        np.testing.assert_array_equal(future.result(5), [i, -i])
+    assert batcher.stats()["items"] == 40
+
+
+def test_encoder_error_reaches_every_waiting_future():
+    encoder = GatedEncoder(error=RuntimeError("model failure"))
+    batcher = MicroBatcher(encoder, max_wait_ms=1000)
+    first = batcher.submit("0")
+    assert encoder.started.wait(5)
+    futures = [batcher.submit(str(i)) for i in range(1, 4)]
+    encoder.release.set()
+
+    first.result(5)
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model failure"):
+            future.result(5)
+    assert encoder.calls[1] == ["1", "2", "3"]
+    # Le planificateur reste utilisable après l'erreur
+    encoder.error = None
+    assert batcher.encode("5")[0] == 5.0
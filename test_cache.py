@@ -0,0 +1,77 @@
+"""
+Caches des questions : durée de vie, éviction LRU, invalidation par version du corpus.
+
+    python -m pytest test_cache.py
+"""
+from modules.analyzer import cache
+from modules.analyzer.cache import LRUCache, QueryCache, normalize_query
+
+
+class Clock:
+    """Horloge contrôlée par le test, à la place de time.monotonic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    lru = LRUCache(maxsize=10, ttl=60)
+    lru.put("a", 1)
+
+    clock.now += 59
+    assert lru.get("a") == 1
+    clock.now += 2
+    assert lru.get("a") is None
+    assert len(lru) == 0
+    assert (lru.hits, lru.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    lru = LRUCache(maxsize=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1  # "b" devient la moins récemment utilisée
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c")) == (1, 3)
+
+
+def test_results_are_cleared_when_version_changes():
+    queries = QueryCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"doc": ["énoncé"]}
+
+    queries.result("question", 1, ("mode1", 2), compute)
+    queries.result("question", 1, ("mode1", 2), compute)
+    assert len(calls) == 1
+
+    queries.result("question", 2, ("mode1", 2), compute)
+    assert len(calls) == 2
+    assert len(queries.results) == 1
+    assert queries.get_result("question", 1, ("mode1", 2)) is None
+
+
+def test_embeddings_survive_version_change():
+    queries = QueryCache()
+    queries.embedding("question", lambda query: [1.0])
+    queries.check_version(5)
+    assert queries.embedding("question", lambda query: [2.0]) == [1.0]
+
+
+def test_keys_keep_case_and_punctuation():
+    # Le modèle distingue la casse : "SI" (système d'information) n'est pas "si"
+    assert normalize_query("  Le  SI\test-il\nsauvegardé ? ") == "Le SI est-il sauvegardé ?"
+    assert normalize_query("Le SI") != normalize_query("le si")
+
+    queries = QueryCache()
+    assert queries.embedding("Le SI", lambda query: query) == "Le SI"
+    assert queries.embedding("le si", lambda query: query) == "le si"
+    assert queries.embedding(" Le   SI ", lambda query: query) == "Le SI"
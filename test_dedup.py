@@ -0,0 +1,51 @@
+"""
+Regroupement des énoncés quasi identiques (MinHash, LSH).
+
+    python -m pytest test_dedup.py
+"""
+import numpy as np
+import pytest
+from modules.analyzer import GroupedScorer, Scorer, StatementIndex, fake_embeddings, near_duplicate_groups, text_shingles
+
+BOILERPLATE = ("Cette politique est révisée au moins une fois par an par le responsable de la "
+               "sécurité des systèmes d'information et validée par la direction générale.")
+
+
+def test_shingles_ignore_case_accents_and_punctuation():
+    assert np.array_equal(text_shingles("Sécurité, des données !"), text_shingles("securite des donnees"))
+    assert len(text_shingles("")) == 0
+
+
+def test_near_duplicates_are_grouped():
+    texts = [
+        BOILERPLATE,
+        "Les sauvegardes sont chiffrées et testées chaque mois.",
+        BOILERPLATE.replace("Cette politique", "Cette Politique"),
+        BOILERPLATE.replace("générale.", "générale"),
+        BOILERPLATE.replace("au moins une fois par an", "chaque trimestre, après chaque incident majeur"),
+        "Les accès distants passent par un VPN.",
+    ]
+    # Groupes numérotés dans l'ordre de leur premier texte
+    assert near_duplicate_groups(texts, 0.8).tolist() == [0, 1, 0, 0, 2, 3]
+
+
+def test_distinct_texts_stay_apart():
+    texts = [f"L'exigence numéro {i} porte sur le domaine {i * 7}" for i in range(50)]
+    texts += ["", "court"]
+    groups = near_duplicate_groups(texts, 0.8)
+    assert len(set(groups.tolist())) == len(texts)
+
+
+def test_grouped_scorer_shares_vectors():
+    vectors = np.eye(3, dtype=np.float32)
+    scorer = GroupedScorer(Scorer(vectors), [0, 1, 0, 2])
+    query = np.array([1, 0, 0], dtype=np.float32)
+    assert scorer.scores(query).tolist() == [1, 0, 1, 0]
+    assert scorer.rescore(query, np.array([2, 3])).tolist() == [1, 0]
+    assert len(scorer) == 4
+
+
+def test_dedup_with_lazy_prefilter_is_rejected():
+    # Sans matrice compacte, le préfiltre encode les énoncés un par un : pas de vecteurs partagés
+    with pytest.raises(ValueError, match="compact"):
+        StatementIndex(fake_embeddings, prefilter=50, dedup=0.8)
@@ -0,0 +1,166 @@
+"""
+Comparaison de StructureParser avec l'algorithme d'origine de détection des sections
+et des énoncés, sur des suites de lignes générées.
+
+    python -m pytest test_extractor.py
+"""
+import random
+import re
+from modules.pdf.extractor import PDFStructureAnalyzer, StructureParser
+
+# Modèles de l'implémentation d'origine (detect_sections_by_regex / detect_statements)
+REFERENCE_SECTION_PATTERNS = [
+    (r'^\s*(\d+)\.\s+([A-Z][\w\s\-\',:]+)$', 1),
+    (r'^\s*(\d+\.\d+)\s+([A-Z][\w\s\-\',:]+)$', 2),
+    (r'^\s*(\d+\.\d+\.\d+)\s+([A-Z][\w\s\-\',:]+)$', 3),
+    (r'^\s*(I{1,3}|IV|V|VI{1,3}|IX|X)\.\s+([A-Z][\w\s\-\',:]+)$', 1),
+    (r'^\s*([A-Z])\.\s+([A-Z][\w\s\-\',:]+)$', 1),
+]
+REFERENCE_STATEMENT_PATTERN = r'^\s*(VUL-?[0-9]+)\s*[:. ]\s*(.*?)$'
+
+LINES = [
+    "1. Politique generale",
+    "2.1 Gestion des acces",
+    "3.1.2 Journalisation",
+    "II. Annexes",
+    "B. Securite physique",
+    "VUL1: Les sauvegardes sont chiffrees",
+    "vul-2. Les acces distants passent par un VPN",
+    "VUL3 Les mots de passe sont robustes",
+    "  VUL-40 : Les correctifs sont appliques",
+    "suite de l'enonce sur une autre ligne",
+    "texte libre sans identifiant",
+    "12/03/2025 StackEdit",
+    "",
+    "   ",
+]
+
+
+def reference_parse(lines):
+    """
+    Algorithme d'origine : sections par expressions régulières, puis pour chaque énoncé
+    une lecture de ses lignes de continuation jusqu'à une ligne vide ou un autre énoncé.
+    """
+    structure, sections = {}, []
+    for line_num, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        for pattern, level in REFERENCE_SECTION_PATTERNS:
+            match = re.match(pattern, line)
+            if match:
+                sections.append({'id': match.group(1), 'title': match.group(2).strip(),
+                                 'level': level, 'line': line_num})
+                structure[match.group(2).strip()] = []
+                break
+
+    for line_num, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        match = re.match(REFERENCE_STATEMENT_PATTERN, line, re.IGNORECASE)
+        if not match:
+            continue
+
+        text = match.group(2)
+        current = line_num + 1
+        while current < len(lines):
+            next_line = lines[current].strip()
+            # Le test de section de l'original (self.section_patterns) n'était jamais actif
+            if re.match(REFERENCE_STATEMENT_PATTERN, next_line, re.IGNORECASE) or not next_line:
+                break
+            text += "\n" + next_line
+            current += 1
+
+        title = None
+        for i, section in enumerate(sections):
+            if line_num >= section['line']:
+                if i == len(sections) - 1 or line_num < sections[i + 1]['line']:
+                    title = section['title']
+                    break
+        if title is None:
+            title = 'None'
+            if title not in structure:
+                structure[title] = []
+        structure[title].append({'id': match.group(1), 'text': text.strip(), 'line': line_num})
+    return structure, sections
+
+
+def random_lines(rng, n):
+    return [rng.choice(LINES) for _ in range(n)]
+
+
+def parse(lines, **options):
+    parser = StructureParser("VUL", **options)
+    for line in lines:
+        parser.feed(line)
+    parser.close()
+    return parser.fill_structure({}), parser.sections
+
+
+def test_structure_parser_matches_reference():
+    rng = random.Random(0)
+    for _ in range(300):
+        lines = random_lines(rng, rng.randint(0, 40))
+        assert parse(lines) == reference_parse(lines), lines
+
+
+def test_two_pass_detection_matches_single_pass():
+    rng = random.Random(1)
+    for _ in range(100):
+        lines = random_lines(rng, rng.randint(0, 40))
+        analyzer = PDFStructureAnalyzer("unused.pdf")
+        analyzer.text_content = "\n".join(lines)
+        analyzer.detect_sections_by_regex()
+        analyzer.detect_statements()
+        assert (analyzer.structure, analyzer.sections) == parse(lines), lines
+
+
+def test_section_title_ends_statement():
+    lines = ["1. Politique generale", "VUL1: Les sauvegardes sont chiffrees", "suite de l'enonce",
+             "2.1 Gestion des acces", "texte libre sans identifiant"]
+    assert parse(lines)[0]["Politique generale"] == [
+        {"id": "VUL1", "text": "Les sauvegardes sont chiffrees\nsuite de l'enonce\n2.1 Gestion des acces\n"
+                               "texte libre sans identifiant", "line": 1},
+    ]
+    assert parse(lines, stop_at_titles=True)[0] == {
+        "Politique generale": [{"id": "VUL1", "text": "Les sauvegardes sont chiffrees\nsuite de l'enonce", "line": 1}],
+        "Gestion des acces": [],
+    }
+
+
+def stream_analyzer(pages):
+    """Analyseur dont les pages sont fournies directement (sans PDF)."""
+    analyzer = PDFStructureAnalyzer("unused.pdf")
+    analyzer.iter_pages = lambda start=0, end=None: iter(pages)
+    return analyzer
+
+
+def test_pages_are_separated_by_default():
+    analyzer = PDFStructureAnalyzer("unused.pdf")
+    analyzer.pages_content = ["1. Introduction\nVUL1: debut de l'enonce\n", "fin de l'enonce\nVUL2: suite\n"]
+    analyzer.text_content = "\n".join(analyzer.pages_content)
+    assert analyzer.parse_structure() == {"Introduction": [
+        {"id": "VUL1", "text": "debut de l'enonce", "line": 1},
+        {"id": "VUL2", "text": "suite", "line": 4},
+    ]}
+
+
+def test_statement_continues_across_pages():
+    analyzer = stream_analyzer([["1. Introduction", "VUL1: debut de l'enonce"], ["fin de l'enonce", "2. Suite"]])
+    structure = analyzer.parse_stream()
+    assert structure["Introduction"] == [{"id": "VUL1", "text": "debut de l'enonce\nfin de l'enonce", "line": 1}]
+    assert structure["Suite"] == []
+    # Numérotation du texte complet, où les pages sont séparées par une ligne vide
+    assert analyzer.sections[1]["line"] == 4
+
+
+def test_stream_ends_statement_at_page_footer():
+    analyzer = stream_analyzer([
+        ["VUL1: Les sauvegardes sont chiffrees", "20/03/2025 17:33", "StackEdit", "https://stackedit.io/app#", "1/2"],
+        ["Texte sans rapport en haut de page", "VUL2: Les acces sont revus"],
+    ])
+    assert analyzer.parse_stream() == {"None": [
+        {"id": "VUL1", "text": "Les sauvegardes sont chiffrees", "line": 0},
+        {"id": "VUL2", "text": "Les acces sont revus", "line": 7},
+    ]}
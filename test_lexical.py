@@ -0,0 +1,49 @@
+"""
+Tokenisation française et scores BM25 sur un petit corpus.
+
+    python -m pytest test_lexical.py
+"""
+import numpy as np
+from modules.analyzer import BM25Index, fold_text, tokenize
+
+CORPUS = [
+    "Les sauvegardes des données sont chiffrées",
+    "L'accès à distance passe par un réseau privé",
+    "Les mots de passe respectent une politique de complexité",
+    "Les incidents de sécurité sont signalés",
+]
+
+
+def test_fold_text_removes_accents_and_elisions():
+    assert fold_text("L'Accès à l’Été") == "acces a ete"
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("Les sauvegardes des données") == ["sauvegarde", "donnee"]
+    assert tokenize("Les réseaux") == tokenize("le réseau")
+    # Les mots courts gardent leur s final
+    assert tokenize("les gens") == ["gens"]
+
+
+def test_bm25_matches_without_accents_or_plural():
+    index = BM25Index.build([tokenize(text) for text in CORPUS])
+    scores = index.scores("sauvegarde des donnees")
+    assert scores.argmax() == 0
+    assert np.count_nonzero(scores) == 1
+
+    assert index.scores("reseau d'acces").argmax() == 1
+    assert index.scores("mot de passe complexe").argmax() == 2
+
+
+def test_bm25_tolerates_typos():
+    index = BM25Index.build([tokenize(text) for text in CORPUS])
+    # "sauvegrade" : aucun mot commun, mais des n-grammes de caractères
+    assert index.scores("sauvegrade").argmax() == 0
+
+
+def test_bm25_candidates():
+    index = BM25Index.build([tokenize(text) for text in CORPUS])
+    indices, scores = index.candidates("incidents de sécurité", size=2)
+    assert indices[np.argmax(scores)] == 3
+    assert len(indices) <= 2
+    assert len(index.candidates("zzz")[0]) == 0
@@ -0,0 +1,98 @@
+"""
+Lecture des listes de questions (mapping.parse_questions) et route /batchMapping,
+avec l'encodeur factice.
+
+    python -m pytest test_mapping.py
+"""
+import io
+import os
+import pytest
+
+# Lus à l'import de ianis : encodeur factice, énoncés des PDF de tests/
+os.environ.setdefault("IANIS_FAKE_ENCODER", "1")
+os.environ.setdefault("IANIS_WARMUP", "0")
+os.environ.setdefault("IANIS_STATEMENT_PREFIX", "E")
+
+from mapping import parse_questions, question_format
+
+
+def test_parse_csv_with_header():
+    ids, questions = parse_questions("id,question\nQ1, Sauvegardes chiffrées \nQ2,Accès distants\n", "csv")
+    assert ids == ["Q1", "Q2"]
+    assert questions == ["Sauvegardes chiffrées", "Accès distants"]
+
+
+def test_parse_csv_without_question_column_uses_first_column():
+    ids, questions = parse_questions("Sauvegardes chiffrées,x\n\nAccès distants,y\n", "csv")
+    assert ids is None
+    assert questions == ["Sauvegardes chiffrées", "Accès distants"]
+
+
+def test_parse_csv_short_row():
+    with pytest.raises(ValueError, match="row 3"):
+        parse_questions("id,question\nQ1,Sauvegardes\nQ2\n", "csv")
+
+
+def test_parse_json_forms():
+    assert parse_questions('["Sauvegardes", "Accès"]', "json") == (None, ["Sauvegardes", "Accès"])
+    assert parse_questions('{"questions": [{"id": 7, "question": "Sauvegardes"}]}', "json") == ([7], ["Sauvegardes"])
+
+
+@pytest.mark.parametrize("text, message", [
+    ('{"questions": "Sauvegardes"}', "list"),
+    ('"Sauvegardes"', "list"),
+    ('[{"id": 1}]', "missing"),
+    ('[1, 2]', "expected a text"),
+    ('[', "Invalid JSON"),
+    ('[]', "No questions"),
+])
+def test_parse_invalid_json(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_questions(text, "json")
+
+
+@pytest.mark.parametrize("fmt", ["csv", "txt"])
+def test_parse_empty_body(fmt):
+    with pytest.raises(ValueError, match="No questions"):
+        parse_questions(" \n\n", fmt)
+
+
+def test_question_format():
+    assert [question_format(name) for name in ["q.CSV", "q.json", "q.txt", "q"]] == ["csv", "json", "txt", "txt"]
+
+
+@pytest.fixture(scope="module")
+def client():
+    from app import app
+
+    return app.test_client()
+
+
+def test_batch_mapping_json(client):
+    response = client.post("/batchMapping", json={"questions": [{"id": "Q1", "question": "Sauvegardes des données"}]},
+                           query_string={"top_k": 1, "top_docs": 1})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["questions"] == 1
+    assert [row["question_id"] for row in data["mapping"]] == ["Q1"]
+
+
+def test_batch_mapping_csv_file(client):
+    upload = (io.BytesIO("question\nSauvegardes des données\nTélétravail\n".encode("utf-8")), "questions.csv")
+    response = client.post("/batchMapping", data={"file": upload, "format": "csv"})
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.get_data(as_text=True).startswith("question_id,question,rank")
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"json": {"questions": "Sauvegardes"}},
+    {"json": []},
+    {"data": {"questions": ""}},
+    {"data": {"file": (io.BytesIO(b"question\n\xff\xfe\n"), "questions.csv")}},
+    {"data": {"file": (io.BytesIO(b"id,question\nQ1\n"), "questions.csv")}},
+])
+def test_batch_mapping_rejects_invalid_lists(client, kwargs):
+    response = client.post("/batchMapping", **kwargs)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,65 @@
+"""
+Qualité des matrices compactes (float16, int8) face aux scores float32.
+
+    python -m pytest test_matrix.py
+"""
+import os
+import numpy as np
+from modules.analyzer import CompactMatrix, Scorer, quantize_int8
+
+
+def random_unit(n, dim, seed):
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((n, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def recall(matrix, exact, queries, top_k):
+    """Part des top_k exacts retrouvés par la matrice compacte."""
+    found = 0
+    for query in queries:
+        expected = set(exact.top_k(query, top_k)[0].tolist())
+        found += len(expected & set(matrix.top_k(query, top_k)[0].tolist()))
+    return found / (len(queries) * top_k)
+
+
+def test_quantize_int8_round_trip():
+    matrix = random_unit(100, 32, seed=0)
+    quantized, scales = quantize_int8(matrix)
+    assert quantized.dtype == np.int8
+    assert np.abs(quantized.astype(np.float32) * scales[:, None] - matrix).max() <= scales.max() / 2 + 1e-6
+
+
+def test_compact_top_k_recall(tmp_path):
+    vectors = random_unit(2000, 64, seed=1)
+    queries = random_unit(50, 64, seed=2)
+    exact = Scorer(vectors)
+
+    for dtype, keep_exact, minimum in [("float16", False, 0.99), ("int8", False, 0.9), ("int8", True, 0.99)]:
+        path = os.path.join(tmp_path, f"{dtype}-{keep_exact}")
+        CompactMatrix.write(path, vectors, dtype, keep_exact)
+        assert os.path.exists(os.path.join(path, "exact.npy")) == keep_exact
+
+        matrix = CompactMatrix.open(path)
+        assert len(matrix) == len(vectors)
+        assert recall(matrix, exact, queries, 10) >= minimum, dtype
+        # Scores approchés proches des scores exacts
+        assert np.abs(matrix.scores(queries) - exact.scores(queries)).max() < 0.02
+
+
+def test_rescored_scores_are_exact(tmp_path):
+    vectors = random_unit(500, 32, seed=3)
+    query = random_unit(1, 32, seed=4)[0]
+    path = os.path.join(tmp_path, "int8")
+    CompactMatrix.write(path, vectors, "int8", keep_exact=True)
+
+    indices, scores = CompactMatrix.open(path).top_k(query, 5)
+    np.testing.assert_allclose(scores, vectors[indices] @ query, rtol=1e-6)
+
+
+def test_write_keeps_existing_matrix(tmp_path):
+    path = os.path.join(tmp_path, "matrix")
+    CompactMatrix.write(path, random_unit(10, 8, seed=5), "float16")
+    CompactMatrix.write(path, random_unit(20, 8, seed=6), "float16")
+    assert len(CompactMatrix.open(path)) == 10
+    assert os.listdir(tmp_path) == ["matrix"]
@@ -0,0 +1,114 @@
+"""
+Index partitionné par document : mise à jour des partitions, fusion des résultats,
+pool de scoring.
+
+    python -m pytest test_shards.py
+"""
+import threading
+import numpy as np
+from modules.analyzer import ShardedStatementIndex, fake_embeddings
+from modules.analyzer import shards as shards_module
+
+DOCUMENTS = {
+    "PSSI": {
+        "Sauvegardes": [{"id": "E1", "text": "Les sauvegardes des données sont chiffrées"},
+                        {"id": "E2", "text": "Les sauvegardes sont testées chaque mois"}],
+        "Accès": [{"id": "E3", "text": "Les accès distants passent par un VPN"}],
+    },
+    "Télétravail": {
+        "Règles": [{"id": "E1", "text": "Le télétravailleur utilise un VPN pour les accès distants"},
+                   {"id": "E2", "text": "Le poste nomade est chiffré"}],
+    },
+    "Crise": {
+        "None": [{"id": "E1", "text": "Une cellule de crise est mobilisable"}],
+    },
+}
+
+
+def build(documents=DOCUMENTS, workers=2):
+    index = ShardedStatementIndex(fake_embeddings, workers=workers)
+    index.build(documents, version=1)
+    return index
+
+
+def brute_force(index, query, top_k):
+    """Meilleurs énoncés de tout le corpus, calculés sur une seule matrice."""
+    vectors = fake_embeddings([row["text"] for row in index.rows])
+    scores = vectors @ fake_embeddings([query])[0]
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [(index.rows[i]["doc"], index.rows[i]["id"]) for i in order], np.sort(scores)[::-1][:top_k]
+
+
+def test_build_creates_one_shard_per_document():
+    index = build()
+    assert sorted(index.shards) == ["Crise", "PSSI", "Télétravail"]
+    assert [len(index.shards[name]) for name in ["Crise", "PSSI", "Télétravail"]] == [1, 3, 2]
+    assert index.vectors == len(index.rows) == 6
+    assert index.version == 1
+
+
+def test_rebuild_only_touches_changed_documents():
+    index = build()
+    pssi, crise = index.shards["PSSI"], index.shards["Crise"]
+
+    documents = {
+        "PSSI": DOCUMENTS["PSSI"],
+        "Crise": {"None": [{"id": "E1", "text": "Une cellule de crise est mobilisable sous une heure"}]},
+        "Développement": {"None": [{"id": "E1", "text": "Les revues de code incluent la sécurité"}]},
+    }
+    index.build(documents, version=2)
+
+    assert sorted(index.shards) == ["Crise", "Développement", "PSSI"]
+    assert index.shards["PSSI"] is pssi
+    assert index.shards["Crise"] is not crise
+    assert index.shards["Crise"].rows[0]["text"].endswith("sous une heure")
+    assert len(index.rows) == 5
+    assert "Télétravail" not in {row["doc"] for row in index.rows}
+
+
+def test_document_without_statements_is_removed():
+    index = build()
+    index.add_shard("Crise", {"None": []})
+    assert "Crise" not in index.shards
+    index.remove_shard("PSSI")
+    index.remove_shard("PSSI")
+    assert list(index.shards) == ["Télétravail"]
+
+
+def test_top_statements_merge_matches_brute_force(monkeypatch):
+    query = "accès distants par VPN"
+    for min_rows in (shards_module.PARALLEL_MIN_ROWS, 0):
+        # 0 : scoring des partitions sur le pool de threads
+        monkeypatch.setattr(shards_module, "PARALLEL_MIN_ROWS", min_rows)
+        index = build()
+        expected, scores = brute_force(index, query, 4)
+        matches = index.top_statements(query, top_k=4)
+        assert [(match["doc"], match["id"]) for match in matches] == expected
+        np.testing.assert_allclose([match["score"] for match in matches], scores, rtol=1e-5)
+
+
+def test_search_routes_to_best_documents():
+    index = build()
+    results = dict(index._search_iter("accès distants par VPN", top_k=1, top_docs=2, min_score=None))
+    assert set(results) == {"PSSI", "Télétravail"}
+    best = index.top_statements("accès distants par VPN", top_k=1)[0]
+    assert list(results)[0] == best["doc"]
+    assert all(len(matches) == 1 for matches in results.values())
+
+
+def test_executor_is_created_once_under_concurrency():
+    index = build(workers=4)
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def first_search():
+        barrier.wait()
+        pools.append(index._executor())
+
+    threads = [threading.Thread(target=first_search) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(pool) for pool in pools}) == 1
+    pools[0].shutdown()
@@ -0,0 +1,53 @@
+"""
+Réponses en flux de /requestMapping (NDJSON et server-sent events).
+
+    python -m pytest test_stream.py
+"""
+import json
+import os
+import pytest
+
+# Lus à l'import de ianis : encodeur factice, énoncés des PDF de tests/
+os.environ.setdefault("IANIS_FAKE_ENCODER", "1")
+os.environ.setdefault("IANIS_WARMUP", "0")
+os.environ.setdefault("IANIS_STATEMENT_PREFIX", "E")
+
+import app as app_module
+
+
+def failing_search(input_text):
+    yield "PSSI_1", [{"text": "E1 Les sauvegardes sont chiffrées", "score": 0.9}]
+    raise RuntimeError("index unavailable")
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def ndjson_events(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line.strip()]
+
+
+def test_ndjson_ends_with_summary(client):
+    response = client.post("/requestMapping", data={"question": "Sauvegardes des données", "stream": "ndjson"})
+    events = ndjson_events(response)
+    assert response.status_code == 200
+    assert events[-1]["type"] == "summary"
+    assert [event["doc"] for event in events[:-1]] == events[-1]["docs"]
+
+
+def test_ndjson_error_event_after_failure(client, monkeypatch):
+    monkeypatch.setattr(app_module, "main_iter", failing_search)
+    events = ndjson_events(client.post("/requestMapping", data={"question": "Sauvegardes", "stream": "ndjson"}))
+    assert [event["type"] for event in events] == ["document", "error"]
+    assert events[-1]["error"] == "index unavailable"
+    assert events[-1]["docs"] == ["PSSI_1"]
+
+
+def test_sse_error_event_after_failure(client, monkeypatch):
+    monkeypatch.setattr(app_module, "main_iter", failing_search)
+    body = client.post("/requestMapping", data={"question": "Sauvegardes", "stream": "sse"}).get_data(as_text=True)
+    messages = [message for message in body.split("\n\n") if message]
+    assert [message.splitlines()[0] for message in messages] == ["event: document", "event: error"]
+    assert json.loads(messages[-1].splitlines()[1][len("data: "):])["error"] == "index unavailable"